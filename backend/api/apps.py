@@ -0,0 +1,44 @@
+import os
+import sys
+
+from django.apps import AppConfig
+from django.conf import settings
+
+
+# Set to '1' by healthcare/wsgi.py and healthcare/asgi.py (or by hand for another server entry point)
+SERVING_PROCESS_ENV = 'HEALTHCARE_SERVING_PROCESS'
+
+
+def _is_serving_process():
+    """True only where requests are answered: WSGI/ASGI entry points and the runserver child
+
+    Anything else that sets Django up (manage.py commands, tests, workers,
+    scripts) must not warm the predictor or start background threads.
+    """
+    if os.environ.get(SERVING_PROCESS_ENV) == '1':
+        return True
+    if os.path.basename(sys.argv[0]) == 'manage.py' and sys.argv[1:2] == ['runserver']:
+        # Skip the autoreloader parent, which only watches files
+        return '--noreload' in sys.argv or os.environ.get('RUN_MAIN') == 'true'
+    return False
+
+
+class ApiConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'api'
+
+    def ready(self):
+        if not _is_serving_process():
+            return
+        
+        if getattr(settings, 'PREDICTION_WRITE_MODE', 'sync') == 'deferred':
+            # Start the writer now so spools left by a crashed process are replayed at boot
+            from .write_behind import get_write_behind_queue
+            get_write_behind_queue()
+        
+        if getattr(settings, 'PREDICTOR_WARM_UP', True):
+            from .inference import warm_up_predictor
+            warm_up_predictor(fail_fast=getattr(settings, 'PREDICTOR_FAIL_FAST', False))
+        
+        from .inference import start_registry_poller
+        start_registry_poller()
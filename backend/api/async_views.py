@@ -0,0 +1,251 @@
+"""Async (ASGI) versions of the read-heavy and prediction endpoints
+
+DRF views are synchronous, so these are plain Django async views that mirror
+the responses of their counterparts in views.py. Model code runs on the
+bounded inference executor and reads use the async ORM; the prediction write
+goes through sync_to_async because transaction.atomic() is sync-only.
+"""
+import functools
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control
+from rest_framework import exceptions, status
+from rest_framework.utils.encoders import JSONEncoder
+
+from .authentication import aauthenticate
+from .inference import DATASET_PATH, aget_predictor, apredict_symptoms, get_fallback_symptom_trie
+from .ml_model import COMMON_SYMPTOMS
+from .models import DoctorProfile, PatientProfile, SymptomPrediction
+from .prediction_writer import build_prediction_rows, write_prediction
+from .serializers import PredictionSerializer
+from .symptom_search import normalize_query
+from .views import (
+    DOCTOR_HISTORY_FIELDS, DOCTOR_HISTORY_PAGE_SIZE, HISTORY_FIELDS, HISTORY_MAX_PAGE_SIZE,
+    HISTORY_PAGE_SIZE, get_user_type, history_entries, history_page_queryset,
+    prediction_response_data, split_history_page,
+)
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, encoder=JSONEncoder)
+
+
+def async_api_view(methods):
+    """Method check and token authentication for an async view, answering like DRF on failure"""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return json_response({'detail': f'Method "{request.method}" not allowed.'},
+                                     status.HTTP_405_METHOD_NOT_ALLOWED)
+            try:
+                credentials = await aauthenticate(request)
+            except exceptions.AuthenticationFailed as e:
+                credentials, detail = None, e.detail
+            else:
+                detail = exceptions.NotAuthenticated.default_detail
+            if credentials is None:
+                response = json_response({'detail': detail}, status.HTTP_401_UNAUTHORIZED)
+                response['WWW-Authenticate'] = 'Token'
+                return response
+
+            request.user, request.auth = credentials
+            return await view(request, *args, **kwargs)
+
+        # Token-authenticated like the DRF views, which are exempt as well
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+@async_api_view(['POST'])
+async def predict_disease(request):
+    """Predict disease - accessible by both patients and doctors"""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return json_response({'error': 'Request body must be a JSON object'}, status.HTTP_400_BAD_REQUEST)
+
+    serializer = PredictionSerializer(data=data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    symptoms = serializer.validated_data['symptoms']
+
+    current_predictor = await aget_predictor()
+    if current_predictor is None:
+        return json_response({
+            'error': 'Disease prediction model is not available. Please check if the training dataset exists.',
+            'details': f'Looking for dataset at: {DATASET_PATH}'
+        }, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    try:
+        result = await apredict_symptoms(current_predictor, symptoms)
+        if result.get('error'):
+            return json_response({
+                'error': result['error'],
+                'details': result.get('available_symptoms', [])
+            }, status.HTTP_400_BAD_REQUEST)
+
+        # Resolve profiles; the caller's own profile was loaded with the token
+        user_type = get_user_type(request.user)
+        if user_type == 'patient':
+            try:
+                patient_profile_id = request.user.patientprofile.id
+            except PatientProfile.DoesNotExist:
+                return json_response({'error': 'Patient profile not found'}, status.HTTP_404_NOT_FOUND)
+            doctor_profile_id = None
+        elif user_type == 'doctor':
+            patient_id = data.get('patient_id')
+            if not patient_id:
+                return json_response({'error': 'patient_id is required for doctor analysis'},
+                                     status.HTTP_400_BAD_REQUEST)
+            try:
+                doctor_profile_id = request.user.doctorprofile.id
+                patient_profile_id = await PatientProfile.objects.values_list('id', flat=True).aget(
+                    user_id=patient_id, user__userprofile__user_type='patient'
+                )
+            except (ValueError, PatientProfile.DoesNotExist, DoctorProfile.DoesNotExist):
+                return json_response({'error': 'Patient or doctor profile not found'}, status.HTTP_404_NOT_FOUND)
+        else:
+            return json_response({'error': 'Access denied'}, status.HTTP_403_FORBIDDEN)
+
+        record, prediction = build_prediction_rows(patient_profile_id, doctor_profile_id, symptoms, data, result)
+        try:
+            await sync_to_async(write_prediction)(record, prediction)
+        except Exception as save_error:
+            print(f"Failed to save prediction: {save_error}")
+            return json_response({
+                'error': 'Prediction could not be saved',
+                'details': str(save_error)
+            }, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return json_response(prediction_response_data(result, symptoms))
+
+    except Exception as e:
+        print(f"Prediction error: {e}")
+        return json_response({
+            'error': 'An error occurred during prediction',
+            'details': str(e)
+        }, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@async_api_view(['GET'])
+async def get_common_symptoms(request):
+    """Get list of common symptoms for frontend"""
+    current_predictor = await aget_predictor()
+
+    if current_predictor and current_predictor.symptoms_list:
+        symptoms = sorted(current_predictor.symptoms_list)
+        return json_response({
+            'symptoms': symptoms,
+            'count': len(symptoms),
+            'message': 'Symptoms from trained model'
+        })
+    return json_response({
+        'symptoms': COMMON_SYMPTOMS,
+        'count': len(COMMON_SYMPTOMS),
+        'message': 'Fallback common symptoms (model not available)'
+    })
+
+
+@async_api_view(['GET'])
+async def get_symptom_suggestions(request):
+    """Get symptom suggestions based on partial input"""
+    query = request.GET.get('q', '').strip()
+
+    if not query:
+        return json_response({'suggestions': []})
+
+    current_predictor = await aget_predictor()
+
+    model_fingerprint = current_predictor.model_fingerprint if current_predictor else 'fallback'
+    etag = '"%s"' % hashlib.md5(f'{model_fingerprint}:{normalize_query(query)}'.encode()).hexdigest()
+
+    # Trie lookups take microseconds, so they run on the event loop
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    elif current_predictor:
+        response = json_response({
+            'suggestions': current_predictor.get_symptom_suggestions(query),
+            'query': query
+        })
+    else:
+        response = json_response({
+            'suggestions': get_fallback_symptom_trie().search(query),
+            'query': query,
+            'message': 'Using fallback symptoms'
+        })
+
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'SYMPTOM_SUGGESTIONS_MAX_AGE', 300))
+    return response
+
+
+@async_api_view(['GET'])
+async def get_available_diseases(request):
+    """Get list of diseases that the model can predict"""
+    current_predictor = await aget_predictor()
+
+    if current_predictor and current_predictor.diseases_list:
+        return json_response({
+            'diseases': sorted(current_predictor.diseases_list),
+            'count': len(current_predictor.diseases_list)
+        })
+    return json_response({
+        'error': 'Disease prediction model is not available',
+        'diseases': [],
+        'count': 0
+    }, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+@async_api_view(['GET'])
+async def get_prediction_history(request):
+    """Get prediction history based on user type, paged with ?cursor= and ?limit="""
+    role = get_user_type(request.user)
+    if role not in ('patient', 'doctor'):
+        return json_response({'error': 'Access denied'}, status.HTTP_403_FORBIDDEN)
+
+    patient_id = request.GET.get('patient_id')
+    default_limit = DOCTOR_HISTORY_PAGE_SIZE if role == 'doctor' and not patient_id else HISTORY_PAGE_SIZE
+    try:
+        limit = int(request.GET.get('limit', default_limit))
+    except ValueError:
+        return json_response({'error': 'limit must be an integer'}, status.HTTP_400_BAD_REQUEST)
+    limit = min(max(limit, 1), HISTORY_MAX_PAGE_SIZE)
+
+    if role == 'patient':
+        # Patients see only their own history
+        try:
+            patient_profile_id = request.user.patientprofile.id
+        except PatientProfile.DoesNotExist:
+            return json_response({'error': 'Profile not found'}, status.HTTP_404_NOT_FOUND)
+
+        predictions = SymptomPrediction.objects.filter(
+            medical_record__patient_id=patient_profile_id
+        ).values(*HISTORY_FIELDS)
+    else:
+        # Doctors see all predictions or filter by patient
+        predictions = SymptomPrediction.objects.all()
+        if patient_id:
+            predictions = predictions.filter(medical_record__patient__user_id=patient_id)
+        predictions = predictions.values(*DOCTOR_HISTORY_FIELDS)
+
+    try:
+        page = history_page_queryset(predictions, request.GET.get('cursor'), limit)
+    except ValueError:
+        return json_response({'error': 'Invalid cursor'}, status.HTTP_400_BAD_REQUEST)
+    rows, next_cursor = split_history_page([row async for row in page], limit)
+
+    history = history_entries(rows, role)
+    return json_response({
+        'history': history,
+        'count': len(history),
+        'next_cursor': next_cursor
+    })
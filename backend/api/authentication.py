@@ -0,0 +1,135 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Upper bound on cached tokens per process
+TOKEN_CACHE_MAX_SIZE = 10000
+
+
+class TokenCache:
+    """In-process token key -> (user, token) cache with a short TTL
+
+    Each process has its own copy, so a logout or role change seen by one
+    worker reaches the others only when their entries expire; keep the TTL short.
+    """
+
+    def __init__(self, max_size=TOKEN_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key, user, token, ttl):
+        with self._lock:
+            self._entries[key] = (user, token, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0].pk == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def invalidate_cached_tokens(user_id):
+    """Forget this process's cached authentication for a user (logout, role or account change)"""
+    token_cache.invalidate_user(user_id)
+
+
+def _token_queryset():
+    return Token.objects.select_related('user__userprofile', 'user__patientprofile', 'user__doctorprofile')
+
+
+def _cached_credentials(key):
+    """(ttl, cached (user, token) or None)"""
+    ttl = getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 0)
+    cached = token_cache.get(key) if ttl else None
+    if cached is not None:
+        user, token = cached
+        # Views may modify request.user, so never hand out the cached instance itself
+        return ttl, (copy.copy(user), token)
+    return ttl, None
+
+
+def _accept_token(key, token, ttl):
+    """Check the loaded user, attach its role and cache the result"""
+    user = token.user
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+    profile = getattr(user, 'userprofile', None)
+    user.user_type = profile.user_type if profile is not None else None
+
+    if ttl:
+        token_cache.set(key, user, token, ttl)
+        return copy.copy(user), token
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that loads token, user, role and profile in one query
+
+    The user's role is attached as request.user.user_type (None without a
+    UserProfile); request.user.patientprofile / doctorprofile come preloaded.
+    Results are cached for AUTH_TOKEN_CACHE_TTL seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        ttl, cached = _cached_credentials(key)
+        if cached is not None:
+            return cached
+
+        try:
+            token = _token_queryset().get(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return _accept_token(key, token, ttl)
+
+
+async def aauthenticate(request):
+    """CachedTokenAuthentication for plain Django async views
+
+    Returns (user, token), or None when the request carries no token;
+    raises AuthenticationFailed for a bad one.
+    """
+    auth = request.headers.get('Authorization', '').split()
+    if not auth or auth[0].lower() != CachedTokenAuthentication.keyword.lower():
+        return None
+    if len(auth) != 2:
+        raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+    key = auth[1]
+    ttl, cached = _cached_credentials(key)
+    if cached is not None:
+        return cached
+
+    try:
+        token = await _token_queryset().aget(key=key)
+    except Token.DoesNotExist:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+    return _accept_token(key, token, ttl)
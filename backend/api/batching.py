@@ -0,0 +1,105 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Collects concurrent single predictions and scores them with one predict_many() call
+
+    submit() returns a Future immediately. Worker threads take the first
+    waiting request, keep collecting until max_batch requests are waiting or
+    max_wait_ms has passed since it arrived, then score the whole batch as one
+    matrix. Requests carry their predictor, so a batch that straddles a model
+    swap is split per predictor.
+    """
+
+    def __init__(self, max_batch=64, max_wait_ms=2.0, workers=1):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.requests = 0
+        self.batches = 0
+        self.batch_sizes = Counter()
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'inference-batcher-{i}', daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, predictor, symptoms):
+        """Future resolving to predictor.predict_disease(symptoms)"""
+        future = Future()
+        self._queue.put((predictor, symptoms, future))
+        return future
+
+    def predict(self, predictor, symptoms, timeout=None):
+        return self.submit(predictor, symptoms).result(timeout)
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'requests': self.requests,
+                'batches': self.batches,
+                'mean_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+                'batch_sizes': dict(sorted(self.batch_sizes.items())),
+            }
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            by_predictor = {}
+            for item in batch:
+                by_predictor.setdefault(id(item[0]), []).append(item)
+
+            for items in by_predictor.values():
+                live = [item for item in items if item[2].set_running_or_notify_cancel()]
+                if not live:
+                    continue
+                try:
+                    results = live[0][0].predict_many([symptoms for _, symptoms, _ in live])
+                except Exception as e:
+                    for _, _, future in live:
+                        future.set_exception(e)
+                    continue
+                for (_, _, future), result in zip(live, results):
+                    future.set_result(result)
+
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.batch_sizes[len(batch)] += 1
@@ -0,0 +1,245 @@
+"""Typed loading of the training CSV, with a binary cache
+
+The CSV is parsed once with explicit dtypes (uint8 symptom columns,
+categorical prognosis) and checked against the expected schema. The result is
+cached next to the CSV as bit-packed .npy files keyed by the CSV's sha256, so
+later training runs on the same file skip CSV parsing entirely: one row of
+the packed matrix is the row's symptom mask in the layout of symptom_bitset.
+
+For exports too large for a dense matrix, stream_training_data() parses the
+CSV in chunks straight into the bit-packed form (1 bit per cell), and
+PackedTrainingData hands out dense chunks one at a time for training.
+"""
+import hashlib
+import json
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+LABEL_COLUMN = 'prognosis'
+
+# Bump when the cached layout changes so stale caches are ignored
+CACHE_FORMAT = 1
+
+# CSV rows parsed at a time by stream_training_data
+DEFAULT_CHUNK_ROWS = 100000
+
+
+class DatasetError(ValueError):
+    """The training CSV does not match the expected schema"""
+
+
+class TrainingData:
+    """Feature matrix X (0/1 uint8), integer labels y and their names"""
+
+    def __init__(self, X, y, symptoms, classes, from_cache=False):
+        self.X = X
+        self.y = y
+        self.symptoms = symptoms
+        self.classes = classes
+        self.from_cache = from_cache
+
+
+class PackedTrainingData:
+    """Bit-packed feature rows (symptom_bitset layout), integer labels y and their names"""
+
+    def __init__(self, packed, y, symptoms, classes):
+        self.packed = packed
+        self.y = y
+        self.symptoms = symptoms
+        self.classes = classes
+
+    def __len__(self):
+        return len(self.y)
+
+    def rows(self, indices):
+        """Dense 0/1 uint8 features for the given row indices"""
+        return np.unpackbits(self.packed[indices], axis=1, count=len(self.symptoms), bitorder='little')
+
+    def chunks(self, indices, chunk_rows):
+        """(X, y) for consecutive slices of indices, at most chunk_rows dense rows in memory at a time"""
+        for start in range(0, len(indices), chunk_rows):
+            chunk = indices[start:start + chunk_rows]
+            yield self.rows(chunk), self.y[chunk]
+
+
+def deduplicate(X, y):
+    """Unique (feature row, label) pairs of X/y and how often each occurs
+
+    Fitting on the unique rows with the counts as sample_weight gives the
+    duplicates their weight without materialising them.
+    """
+    packed = np.packbits(X, axis=1, bitorder='little')
+    keys = np.hstack([packed, y.astype('<i4').view(np.uint8).reshape(len(y), 4)])
+    unique_keys, counts = np.unique(keys, axis=0, return_counts=True)
+    X_unique = np.unpackbits(unique_keys[:, :packed.shape[1]], axis=1, count=X.shape[1], bitorder='little')
+    y_unique = np.ascontiguousarray(unique_keys[:, packed.shape[1]:]).view('<i4').ravel().astype(y.dtype)
+    return X_unique, y_unique, counts
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def default_cache_dir(csv_path):
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), 'dataset_cache')
+
+
+def _csv_schema(csv_path):
+    """(symptom columns, unnamed columns, read_csv dtypes) from the CSV header"""
+    header = pd.read_csv(csv_path, nrows=0).columns.tolist()
+    if LABEL_COLUMN not in header:
+        raise DatasetError(f"'{LABEL_COLUMN}' column not found in {csv_path}")
+
+    # Trailing commas in the export produce unnamed, empty columns
+    unnamed = [column for column in header if column.startswith('Unnamed:')]
+    symptoms = [column for column in header if column != LABEL_COLUMN and column not in unnamed]
+    if len(set(symptoms)) != len(symptoms):
+        raise DatasetError(f"Duplicate symptom columns in {csv_path}")
+
+    dtypes = {column: 'object' for column in unnamed}
+    dtypes.update({column: 'uint8' for column in symptoms})
+    dtypes[LABEL_COLUMN] = 'category'
+    return symptoms, unnamed, dtypes
+
+
+def _validated_features(df, csv_path, symptoms, unnamed):
+    """The symptom matrix of a parsed frame, after checking its values"""
+    for column in unnamed:
+        if df[column].notna().any():
+            raise DatasetError(f"Column '{column}' has no name but contains values")
+    if df[LABEL_COLUMN].isna().any():
+        raise DatasetError(f"Rows without a '{LABEL_COLUMN}' value in {csv_path}")
+
+    X = df[symptoms].to_numpy()
+    if X.max(initial=0) > 1:
+        raise DatasetError("Symptom columns must hold 0/1 values")
+    return X
+
+
+def _read_csv(csv_path, dtypes, **kwargs):
+    try:
+        return pd.read_csv(csv_path, dtype=dtypes, **kwargs)
+    except (ValueError, OverflowError) as e:
+        raise DatasetError(f"Symptom columns must hold 0/1 values: {e}")
+
+
+def read_training_csv(csv_path):
+    """Parse and validate the CSV; raises DatasetError on a schema problem"""
+    symptoms, unnamed, dtypes = _csv_schema(csv_path)
+    df = _read_csv(csv_path, dtypes)
+    X = _validated_features(df, csv_path, symptoms, unnamed)
+
+    labels = df[LABEL_COLUMN]
+    classes = sorted(labels.cat.categories.tolist())
+    # Codes in sorted-name order, as LabelEncoder would assign them
+    y = labels.cat.reorder_categories(classes).cat.codes.to_numpy().astype(np.int64)
+    return TrainingData(np.ascontiguousarray(X), y, symptoms, classes)
+
+
+def stream_training_data(csv_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """PackedTrainingData for the CSV, parsed chunk_rows at a time
+
+    Peak memory is one parsed chunk plus the packed result, about
+    rows * symptoms / 8 bytes, instead of a full DataFrame.
+    """
+    symptoms, unnamed, dtypes = _csv_schema(csv_path)
+    label_codes = {}
+    packed_chunks = []
+    code_chunks = []
+
+    with _read_csv(csv_path, dtypes, chunksize=chunk_rows) as reader:
+        while True:
+            try:
+                df = next(reader)
+            except StopIteration:
+                break
+            except (ValueError, OverflowError) as e:
+                raise DatasetError(f"Symptom columns must hold 0/1 values: {e}")
+            X = _validated_features(df, csv_path, symptoms, unnamed)
+            packed_chunks.append(np.packbits(X, axis=1, bitorder='little'))
+
+            # Category codes are per chunk; map them onto codes shared by the whole file
+            labels = df[LABEL_COLUMN].cat
+            chunk_map = np.array([label_codes.setdefault(label, len(label_codes)) for label in labels.categories],
+                                 dtype=np.int32)
+            code_chunks.append(chunk_map[labels.codes.to_numpy()])
+
+    if not packed_chunks:
+        raise DatasetError(f"No rows in {csv_path}")
+
+    # Renumber labels in sorted-name order, as LabelEncoder would
+    classes = sorted(label_codes)
+    sorted_codes = np.empty(len(classes), dtype=np.int32)
+    for position, label in enumerate(classes):
+        sorted_codes[label_codes[label]] = position
+    y = sorted_codes[np.concatenate(code_chunks)]
+    return PackedTrainingData(np.concatenate(packed_chunks), y, symptoms, classes)
+
+
+def _cache_paths(cache_dir, csv_hash):
+    stem = os.path.join(cache_dir, f'training-{csv_hash[:16]}')
+    return f'{stem}.bits.npy', f'{stem}.labels.npy', f'{stem}.json'
+
+
+def _read_cache(cache_dir, csv_hash):
+    bits_path, labels_path, meta_path = _cache_paths(cache_dir, csv_hash)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('format') != CACHE_FORMAT or meta.get('sha256') != csv_hash:
+            return None
+        packed = np.load(bits_path)
+        y = np.load(labels_path).astype(np.int64)
+    except (OSError, ValueError):
+        return None
+    X = np.unpackbits(packed, axis=1, count=len(meta['symptoms']), bitorder='little')
+    return TrainingData(X, y, meta['symptoms'], meta['classes'], from_cache=True)
+
+
+def _write_cache(cache_dir, csv_hash, data):
+    """Write the cache files; the metadata goes last, so a partial cache is never read"""
+    os.makedirs(cache_dir, exist_ok=True)
+    bits_path, labels_path, meta_path = _cache_paths(cache_dir, csv_hash)
+    label_dtype = np.uint8 if len(data.classes) <= 256 else np.uint16
+    meta = {
+        'format': CACHE_FORMAT,
+        'sha256': csv_hash,
+        'rows': int(len(data.y)),
+        'symptoms': data.symptoms,
+        'classes': data.classes,
+    }
+    suffix = f'.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp'
+    for path, write in (
+        (bits_path, lambda f: np.save(f, np.packbits(data.X, axis=1, bitorder='little'))),
+        (labels_path, lambda f: np.save(f, data.y.astype(label_dtype))),
+        (meta_path, lambda f: f.write(json.dumps(meta).encode())),
+    ):
+        with open(path + suffix, 'wb') as f:
+            write(f)
+        os.replace(path + suffix, path)
+
+
+def load_training_data(csv_path, cache_dir=None, use_cache=True):
+    """TrainingData for the CSV, from the binary cache when it matches the file's hash"""
+    if not use_cache:
+        return read_training_csv(csv_path)
+
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    csv_hash = file_sha256(csv_path)
+    data = _read_cache(cache_dir, csv_hash)
+    if data is not None:
+        return data
+
+    data = read_training_csv(csv_path)
+    try:
+        _write_cache(cache_dir, csv_hash, data)
+    except OSError as e:
+        print(f"Could not write dataset cache to {cache_dir}: {e}")
+    return data
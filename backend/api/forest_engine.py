@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+from scipy import sparse
+
+# Arrays written by FlatForest.save(), one .npy file each so they can be memory-mapped
+FLAT_FOREST_ARRAYS = ('feature', 'children', 'leaf_proba', 'roots', 'max_depth')
+
+# JSON written next to the arrays with whatever else the caller needs to serve the forest
+FLAT_FOREST_METADATA = 'metadata.json'
+
+
+class FlatForest:
+    """RandomForestClassifier exported to contiguous node arrays for 0/1 inputs
+
+    Every tree of the forest is laid out in the same arrays, with child indices
+    offset so they point into the shared arrays. Because inputs are binary
+    symptom flags, each split threshold is folded into its children at export
+    time: children[node] holds the next node for a feature value of 0 and 1.
+    Leaves point to themselves, so all rows can be advanced through all trees
+    with a fixed number of vectorized steps.
+    """
+
+    def __init__(self, feature, children, leaf_proba, roots, max_depth, metadata=None):
+        self.feature = feature
+        self.children = children
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.metadata = metadata or {}
+
+    @property
+    def n_classes(self):
+        return self.leaf_proba.shape[1]
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Export a fitted RandomForestClassifier"""
+        features, lefts, rights, probas, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            # Fold the threshold into the children: for x in {0, 1}, x <= t goes left
+            left = tree.children_left.copy()
+            right = tree.children_right.copy()
+            always_left = ~is_leaf & (tree.threshold >= 1)
+            always_right = ~is_leaf & (tree.threshold < 0)
+            right[always_left] = left[always_left]
+            left[always_right] = right[always_right]
+
+            # Leaves loop on themselves
+            left = np.where(is_leaf, node_ids, left) + offset
+            right = np.where(is_leaf, node_ids, right) + offset
+
+            value = tree.value[:, 0, :]
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            lefts.append(left)
+            rights.append(right)
+            probas.append(value / totals)
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            children=np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1).astype(np.int32),
+            leaf_proba=np.concatenate(probas).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+        )
+
+    def predict_proba(self, X):
+        """Mean leaf class distribution over all trees; X must hold 0/1 values"""
+        X = np.atleast_2d(np.asarray(X)) != 0
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+
+        # One cursor per (row, tree), advanced max_depth times over the flattened input
+        row_offsets = np.repeat(np.arange(n_rows) * n_features, n_trees)
+        nodes = np.tile(self.roots, n_rows)
+        flat_X = X.ravel()
+        for _ in range(self.max_depth):
+            nodes = self.children[nodes, flat_X[row_offsets + self.feature[nodes]].view(np.uint8)]
+
+        # Averaging leaf distributions as a sparse (rows x nodes) product avoids a
+        # rows x trees x classes intermediate
+        leaf_weights = sparse.csr_matrix(
+            (np.full(n_rows * n_trees, 1.0 / n_trees), nodes, np.arange(0, n_rows * n_trees + 1, n_trees)),
+            shape=(n_rows, len(self.feature)),
+        )
+        return np.asarray(leaf_weights @ self.leaf_proba)
+
+    def save(self, directory):
+        """Write the node arrays as uncompressed .npy files, replacing any previous export
+
+        The arrays go to a fresh directory that is then renamed into place, so
+        a reader never sees a mix of old and new files; processes mapping the
+        old files keep valid pages.
+        """
+        directory = os.path.normpath(directory)
+        staging = f'{directory}.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp'
+        os.makedirs(staging)
+        for name in FLAT_FOREST_ARRAYS:
+            np.save(os.path.join(staging, f'{name}.npy'), np.atleast_1d(getattr(self, name)))
+        with open(os.path.join(staging, FLAT_FOREST_METADATA), 'w') as f:
+            json.dump(self.metadata, f)
+
+        # A directory cannot be renamed over a non-empty one: move the old export aside first
+        retired = None
+        if os.path.exists(directory):
+            retired = staging + '.old'
+            os.rename(directory, retired)
+        os.rename(staging, directory)
+        if retired:
+            shutil.rmtree(retired, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        """Load node arrays written by save(), optionally memory-mapped
+
+        Raises OSError if the export is missing or was replaced while loading.
+        """
+        generation = os.stat(directory).st_ino
+        arrays = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in FLAT_FOREST_ARRAYS
+        }
+        try:
+            with open(os.path.join(directory, FLAT_FOREST_METADATA)) as f:
+                arrays['metadata'] = json.load(f)
+        except FileNotFoundError:
+            arrays['metadata'] = {}
+        if os.stat(directory).st_ino != generation:
+            raise OSError(f"Flat forest at {directory} was replaced while loading")
+        arrays['max_depth'] = int(arrays['max_depth'][0])
+        return cls(**arrays)
@@ -0,0 +1,284 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .batching import MicroBatcher
+from .ml_model import COMMON_SYMPTOMS, DiseasePredictor
+from .model_registry import ModelRegistry, RegistryPoller
+from .prediction_cache import build_prediction_cache
+from .symptom_search import SymptomTrie
+
+BASE_DIR = getattr(settings, 'BASE_DIR', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MODEL_PATH = os.path.join(BASE_DIR, 'disease_model.joblib')
+DATASET_PATH = os.path.join(BASE_DIR, 'Training.csv')
+
+if not os.path.exists(DATASET_PATH):
+    DATASET_PATH = r'D:\1c\backend\Training.csv'
+
+# While in these states get_predictor() neither loads nor starts another training job;
+# a failed on-demand training is only retried through /api/model/train/
+TRAINING_STATES = ('training', 'training_failed')
+
+# Seconds between load attempts while a training job owned by another process runs
+LOAD_RETRY_INTERVAL = 5.0
+
+# Symptoms pushed through the model once after loading so the first real request is not the slow one
+WARM_UP_SYMPTOMS = ['itching', 'skin_rash', 'high_fever']
+
+_predictor = None
+_predictor_lock = threading.Lock()
+_swap_lock = threading.Lock()
+_registry_poller = None
+_next_load_attempt = 0.0
+_fallback_symptom_trie = None
+_inference_executor = None
+_micro_batcher = None
+_status = {
+    'ready': False,
+    'state': 'not_loaded',
+    'error': None,
+    'load_seconds': None,
+    'loaded_at': None,
+    'load_stats': None,
+    'model_version': None,
+}
+
+
+def get_model_registry():
+    """The ModelRegistry configured by MODEL_REGISTRY, or None when the registry is disabled"""
+    config = getattr(settings, 'MODEL_REGISTRY', None) or {}
+    if not config.get('DIR'):
+        return None
+    return ModelRegistry(config['DIR'])
+
+
+def active_model_path():
+    """(path, version) of the model to serve: the registry's active version, else MODEL_PATH"""
+    registry = get_model_registry()
+    version = registry.active_version() if registry is not None else None
+    if version is None:
+        return MODEL_PATH, None
+    return registry.model_path(version), version
+
+
+def _load_model_file():
+    """A warmed-up predictor for the active model, or None when the file cannot be loaded"""
+    model_path, version = active_model_path()
+    predictor = DiseasePredictor()
+    mmap_mode = getattr(settings, 'PREDICTOR_MMAP_MODE', None)
+    backend = getattr(settings, 'PREDICTOR_BACKEND', 'sklearn')
+    if not predictor.load_model(model_path, mmap_mode=mmap_mode, backend=backend):
+        return None
+    if version is not None:
+        predictor.model_version = version
+    
+    # Each model gets its own cache: during a swap the old model keeps answering (and caching)
+    predictor.attach_cache(build_prediction_cache(getattr(settings, 'PREDICTION_CACHE', None)))
+    
+    # Dummy inference to warm up sklearn/numpy code paths
+    predictor.predict_disease(WARM_UP_SYMPTOMS)
+    return predictor
+
+
+def _publish_predictor(predictor, started):
+    """Make predictor the one every request uses; caller must hold _predictor_lock"""
+    global _predictor
+    _predictor = predictor
+    _status.update(
+        ready=True,
+        state='ready',
+        error=None,
+        load_seconds=round(time.perf_counter() - started, 4),
+        loaded_at=timezone.now(),
+        load_stats=predictor.load_stats,
+        model_version=predictor.model_version,
+    )
+
+
+def _load_predictor():
+    """Load the model and publish it; caller must hold _predictor_lock"""
+    started = time.perf_counter()
+    _status['state'] = 'loading'
+    
+    predictor = _load_model_file()
+    if predictor is None:
+        print("Failed to initialize predictor")
+        _status.update(ready=False, state='unavailable', error=f'Model not available at {active_model_path()[0]}')
+        return None
+    
+    _publish_predictor(predictor, started)
+    return predictor
+
+
+def get_predictor():
+    """Return the shared predictor, loading it on first use if warm-up did not run
+    
+    Never trains inline: without a model file this returns None and, with
+    PREDICTOR_TRAIN_ON_DEMAND, starts a background training job instead. If
+    another process's job is already running, its completion is not reported
+    here, so loading is retried every LOAD_RETRY_INTERVAL seconds instead.
+    """
+    global _next_load_attempt
+    predictor = _predictor
+    if predictor is not None or _status['state'] in TRAINING_STATES or time.monotonic() < _next_load_attempt:
+        return predictor
+    
+    with _predictor_lock:
+        # Another thread may have finished loading while we waited for the lock
+        if _predictor is None and _status['state'] not in TRAINING_STATES and time.monotonic() >= _next_load_attempt:
+            _load_predictor()
+            if _predictor is None and getattr(settings, 'PREDICTOR_TRAIN_ON_DEMAND', True):
+                from .training_jobs import start_training_job
+                job, created = start_training_job()
+                if created:
+                    _status['state'] = 'training'
+                else:
+                    _status['error'] = f'Waiting for training job {job.pk} to finish'
+                    _next_load_attempt = time.monotonic() + LOAD_RETRY_INTERVAL
+        return _predictor
+
+
+def training_finished(error=None):
+    """Record the end of the on-demand training started by get_predictor()"""
+    if error is not None and _predictor is None:
+        _status.update(state='training_failed', error=error)
+
+
+def swap_predictor():
+    """Load the active model again and atomically replace the serving predictor
+    
+    Read-copy-update: the new model is loaded and warmed up off to the side and
+    published with a single reference assignment. Requests that already hold
+    the old predictor finish on it; later requests get the new one. Returns the
+    new predictor, or None (the old one stays in place) when loading fails.
+    """
+    with _swap_lock:
+        started = time.perf_counter()
+        predictor = _load_model_file()
+        if predictor is None:
+            return None
+        with _predictor_lock:
+            _publish_predictor(predictor, started)
+    print(f"Now serving model version {predictor.model_version}")
+    return predictor
+
+
+def _registry_version_changed(version):
+    predictor = _predictor
+    if predictor is not None and predictor.model_version == version:
+        return
+    swap_predictor()
+
+
+def start_registry_poller():
+    """Hot-swap the predictor whenever the registry's active version changes"""
+    global _registry_poller
+    registry = get_model_registry()
+    interval = (getattr(settings, 'MODEL_REGISTRY', None) or {}).get('POLL_INTERVAL', 5.0)
+    if registry is None or not interval or _registry_poller is not None:
+        return None
+    
+    predictor = _predictor
+    _registry_poller = RegistryPoller(
+        registry, interval, _registry_version_changed,
+        current_version=predictor.model_version if predictor is not None else None,
+    )
+    _registry_poller.start()
+    return _registry_poller
+
+
+def get_inference_executor():
+    """Thread pool that async views run model code on, sized by INFERENCE_MAX_WORKERS"""
+    global _inference_executor
+    if _inference_executor is None:
+        with _predictor_lock:
+            if _inference_executor is None:
+                _inference_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'INFERENCE_MAX_WORKERS', 4), thread_name_prefix='inference'
+                )
+    return _inference_executor
+
+
+async def run_inference(func, *args):
+    """Run blocking model code on the inference executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_inference_executor(), functools.partial(func, *args))
+
+
+async def aget_predictor():
+    """Async get_predictor(); only a first-time load leaves the event loop"""
+    predictor = _predictor
+    if predictor is not None:
+        return predictor
+    return await run_inference(get_predictor)
+
+
+def get_micro_batcher():
+    """Shared MicroBatcher configured by INFERENCE_BATCHING, or None when batching is disabled"""
+    global _micro_batcher
+    config = getattr(settings, 'INFERENCE_BATCHING', None) or {}
+    if not config.get('ENABLED'):
+        return None
+    if _micro_batcher is None:
+        with _predictor_lock:
+            if _micro_batcher is None:
+                _micro_batcher = MicroBatcher(
+                    max_batch=config.get('MAX_BATCH', 64),
+                    max_wait_ms=config.get('MAX_WAIT_MS', 2.0),
+                    workers=config.get('WORKERS', 1),
+                )
+    return _micro_batcher
+
+
+def predict_symptoms(predictor, symptoms):
+    """predictor.predict_disease(symptoms), micro-batched with concurrent requests when enabled"""
+    batcher = get_micro_batcher()
+    if batcher is None:
+        return predictor.predict_disease(symptoms)
+    return batcher.predict(predictor, symptoms)
+
+
+async def apredict_symptoms(predictor, symptoms):
+    """Async predict_symptoms(); waits on the batch future instead of occupying an executor thread"""
+    batcher = get_micro_batcher()
+    if batcher is None:
+        return await run_inference(predictor.predict_disease, symptoms)
+    return await asyncio.wrap_future(batcher.submit(predictor, symptoms))
+
+
+def get_fallback_symptom_trie():
+    """Suggestion index over COMMON_SYMPTOMS for when no model is available"""
+    global _fallback_symptom_trie
+    if _fallback_symptom_trie is None:
+        _fallback_symptom_trie = SymptomTrie(COMMON_SYMPTOMS)
+    return _fallback_symptom_trie
+
+
+def warm_up_predictor(fail_fast=False):
+    """Load the model at process start, never training inline"""
+    with _predictor_lock:
+        if _predictor is None:
+            _load_predictor()
+    
+    if _predictor is None and fail_fast:
+        raise ImproperlyConfigured(
+            f"Disease prediction model could not be loaded from {MODEL_PATH}. "
+            "Train it with 'manage.py train_model' before starting the server."
+        )
+    return _predictor
+
+
+def predictor_status():
+    """Snapshot of the predictor readiness state and cache counters"""
+    snapshot = dict(_status)
+    predictor = _predictor
+    snapshot['cache'] = predictor.cache.stats() if predictor is not None and predictor.cache is not None else None
+    snapshot['batching'] = _micro_batcher.stats() if _micro_batcher is not None else None
+    return snapshot
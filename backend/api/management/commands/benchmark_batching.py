@@ -0,0 +1,71 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api.batching import MicroBatcher
+from api.inference import get_predictor
+
+from .benchmark_predict import percentile
+
+
+class Command(BaseCommand):
+    help = 'Latency/throughput curve of micro-batched inference for different batching windows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Predictions per configuration')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64],
+                            help='Concurrent callers to test')
+        parser.add_argument('--windows', type=float, nargs='+', default=[0, 0.5, 2, 5],
+                            help='MAX_WAIT_MS values to test; 0 means no batching')
+        parser.add_argument('--max-batch', type=int, nargs='+', default=[64], help='MAX_BATCH values to test')
+        parser.add_argument('--workers', type=int, default=1, help='Batching threads')
+        parser.add_argument('--keep-cache', action='store_true',
+                            help='Leave the prediction cache attached (by default every request runs the model)')
+
+    def handle(self, *args, **options):
+        predictor = get_predictor()
+        if predictor is None:
+            self.stderr.write('Disease prediction model is not available')
+            return
+
+        cache = predictor.cache
+        if not options['keep_cache']:
+            predictor.cache = None
+
+        symptom_sets = [
+            random.sample(predictor.symptoms_list, random.randint(2, 6)) for _ in range(options['requests'])
+        ]
+        configurations = [(0, None)] if 0 in options['windows'] else []
+        configurations += [(window, max_batch) for window in options['windows'] if window
+                           for max_batch in options['max_batch']]
+
+        try:
+            for concurrency in options['concurrency']:
+                for window, max_batch in configurations:
+                    batcher = MicroBatcher(max_batch=max_batch, max_wait_ms=window,
+                                           workers=options['workers']) if max_batch else None
+
+                    def call(symptoms):
+                        started = time.perf_counter()
+                        if batcher is None:
+                            predictor.predict_disease(symptoms)
+                        else:
+                            batcher.predict(predictor, symptoms)
+                        return (time.perf_counter() - started) * 1000
+
+                    started = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                        timings = list(pool.map(call, symptom_sets))
+                    wall = time.perf_counter() - started
+
+                    label = 'unbatched' if batcher is None else f'{window:g} ms / {max_batch} rows'
+                    line = (f'c={concurrency:<3} {label:>18}: p50 {percentile(timings, 0.5):.2f} ms, '
+                            f'p99 {percentile(timings, 0.99):.2f} ms, {len(timings) / wall:.0f} predictions/s')
+                    if batcher is not None:
+                        batcher.stop()
+                        line += f", mean batch {batcher.stats()['mean_batch_size']}"
+                    self.stdout.write(line)
+        finally:
+            predictor.cache = cache
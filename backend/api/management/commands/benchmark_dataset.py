@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from api.dataset import load_training_data, read_training_csv
+from api.inference import DATASET_PATH
+
+
+def load_untyped(csv_path):
+    """The pre-dataset.py loader: default dtype inference, then a dense copy of the features"""
+    df = pd.read_csv(csv_path)
+    return df.drop('prognosis', axis=1).values, df['prognosis']
+
+
+class Command(BaseCommand):
+    help = 'Compare training-data load time and peak memory: untyped CSV, typed CSV and the binary cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', default=str(DATASET_PATH), help='Training CSV')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed loads per loader (best is reported)')
+
+    def handle(self, *args, **options):
+        csv_path = options['dataset']
+        cache_dir = tempfile.mkdtemp(prefix='dataset-cache-')
+        try:
+            load_training_data(csv_path, cache_dir=cache_dir)
+            loaders = [
+                ('untyped CSV', lambda: load_untyped(csv_path)),
+                ('typed CSV', lambda: read_training_csv(csv_path)),
+                ('binary cache', lambda: load_training_data(csv_path, cache_dir=cache_dir)),
+            ]
+            self.stdout.write(f'{os.path.basename(csv_path)}: {os.path.getsize(csv_path) / 1024:.0f} KB')
+            for label, load in loaders:
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    load()
+                    timings.append(time.perf_counter() - started)
+
+                # Peak is measured in a separate run: tracing slows the load down
+                tracemalloc.start()
+                result = load()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                X = result[0] if isinstance(result, tuple) else result.X
+                self.stdout.write(
+                    f'{label:>13}: {min(timings) * 1000:7.1f} ms, peak {peak / 1024:8.0f} KB, '
+                    f'features {X.dtype} {X.shape[0]}x{X.shape[1]} = {X.nbytes / 1024:.0f} KB'
+                )
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
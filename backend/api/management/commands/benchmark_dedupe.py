@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+
+from api.dataset import deduplicate, load_training_data
+from api.inference import DATASET_PATH
+from api.ml_model import DEFAULT_FOREST_PARAMS, TRAINING_RANDOM_STATE
+from api.training import model_size_bytes
+
+
+class Command(BaseCommand):
+    help = 'Compare fitting on every training row with fitting on unique rows weighted by their counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', default=str(DATASET_PATH), help='Training CSV')
+        parser.add_argument('--repeat', type=int, default=3, help='Fits per variant (best time is reported)')
+        parser.add_argument('--n-jobs', type=int, default=None, help='Cores for the fit')
+
+    def handle(self, *args, **options):
+        data = load_training_data(options['dataset'])
+        # Split before deduplicating, exactly as train_model does
+        X_train, X_test, y_train, y_test = train_test_split(
+            data.X, data.y, test_size=0.2, random_state=TRAINING_RANDOM_STATE, stratify=data.y
+        )
+        started = time.perf_counter()
+        X_unique, y_unique, counts = deduplicate(X_train, y_train)
+        dedupe_seconds = time.perf_counter() - started
+        self.stdout.write(f'{len(X_train)} training rows -> {len(X_unique)} unique rows '
+                          f'({len(X_train) / len(X_unique):.1f}x reduction, deduplication {dedupe_seconds * 1000:.1f} ms)')
+
+        results = {}
+        for label, X_fit, y_fit, weights in (
+            ('all rows', X_train, y_train, None),
+            ('unique rows', X_unique, y_unique, counts),
+        ):
+            timings = []
+            for _ in range(options['repeat']):
+                model = RandomForestClassifier(random_state=TRAINING_RANDOM_STATE, n_jobs=options['n_jobs'],
+                                               **DEFAULT_FOREST_PARAMS)
+                started = time.perf_counter()
+                model.fit(X_fit, y_fit, sample_weight=weights)
+                timings.append(time.perf_counter() - started)
+            accuracy = float((model.predict(X_test) == y_test).mean())
+            results[label] = (min(timings), accuracy)
+            self.stdout.write(f'{label:>12}: fit {min(timings):.3f} s, test accuracy {accuracy:.4f}, '
+                              f'model {model_size_bytes(model) / 1024:.0f} KB')
+
+        (full_fit, full_accuracy), (unique_fit, unique_accuracy) = results['all rows'], results['unique rows']
+        self.stdout.write(f'fit time {unique_fit - full_fit:+.3f} s ({full_fit / unique_fit:.1f}x faster), '
+                          f'accuracy {unique_accuracy - full_accuracy:+.4f}')
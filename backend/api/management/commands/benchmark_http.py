@@ -0,0 +1,74 @@
+import json
+import random
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from api.ml_model import COMMON_SYMPTOMS
+from api.models import PatientProfile, UserProfile
+
+from .benchmark_predict import BENCH_USERNAME, percentile
+
+
+class Command(BaseCommand):
+    help = ('Load-test a running server (runserver/gunicorn for WSGI, uvicorn for ASGI) '
+            'and report latency percentiles and throughput per endpoint')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server base URL')
+        parser.add_argument('--prefix', default='/api/', help="URL prefix, e.g. /api/async/ for the async views")
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                            help='Concurrent client connections to test')
+        parser.add_argument('--endpoints', nargs='+', default=['predict/', 'symptoms/suggestions/', 'predictions/history/'])
+
+    def handle(self, *args, **options):
+        # The server must use the same database for this token to be valid
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME, defaults={'first_name': 'Bench'})
+        UserProfile.objects.get_or_create(user=user, defaults={'user_type': 'patient'})
+        PatientProfile.objects.get_or_create(user=user)
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {'Authorization': f'Token {token.key}', 'Content-Type': 'application/json'}
+
+        def build(endpoint):
+            url = options['url'].rstrip('/') + options['prefix'] + endpoint
+            if endpoint == 'predict/':
+                body = json.dumps({'symptoms': random.sample(COMMON_SYMPTOMS, random.randint(1, 4))}).encode()
+                return urllib.request.Request(url, data=body, headers=headers, method='POST')
+            if endpoint == 'symptoms/suggestions/':
+                url += '?q=' + random.choice(COMMON_SYMPTOMS)[:random.randint(1, 4)]
+            return urllib.request.Request(url, headers=headers)
+
+        def call(request):
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    response.read()
+                    code = response.status
+            except urllib.error.HTTPError as e:
+                code = e.code
+            except OSError:
+                code = None
+            return (time.perf_counter() - started) * 1000, code
+
+        for endpoint in options['endpoints']:
+            for concurrency in options['concurrency']:
+                requests = [build(endpoint) for _ in range(options['requests'])]
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    results = list(pool.map(call, requests))
+                wall = time.perf_counter() - started
+
+                timings = [elapsed for elapsed, _ in results]
+                errors = sum(1 for _, code in results if code is None or code >= 500)
+                self.stdout.write(
+                    f'{options["prefix"]}{endpoint} c={concurrency}: p50 {percentile(timings, 0.5):.1f} ms, '
+                    f'p99 {percentile(timings, 0.99):.1f} ms, mean {statistics.mean(timings):.1f} ms, '
+                    f'{len(results) / wall:.0f} req/s, {errors} errors'
+                )
@@ -0,0 +1,77 @@
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from api import views
+from api.inference import get_predictor
+from api.models import PatientProfile, UserProfile
+from api.prediction_writer import WRITE_MODES, flush_deferred_writes
+from api.write_behind import get_write_behind_queue
+
+BENCH_USERNAME = 'bench_predict_patient'
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = 'Measure /api/predict/ latency (p50/p99) for each prediction write mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per write mode')
+        parser.add_argument('--concurrency', type=int, default=1, help='Client threads issuing requests')
+        parser.add_argument('--modes', nargs='+', choices=WRITE_MODES, default=list(WRITE_MODES))
+
+    def handle(self, *args, **options):
+        predictor = get_predictor()
+        if predictor is None:
+            self.stderr.write('Disease prediction model is not available')
+            return
+
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME, defaults={'first_name': 'Bench'})
+        UserProfile.objects.get_or_create(user=user, defaults={'user_type': 'patient'})
+        PatientProfile.objects.get_or_create(user=user)
+        token, _ = Token.objects.get_or_create(user=user)
+
+        factory = APIRequestFactory()
+        symptom_sets = [
+            random.sample(predictor.symptoms_list, random.randint(1, 6)) for _ in range(options['requests'])
+        ]
+
+        def call(symptoms):
+            request = factory.post('/api/predict/', {'symptoms': symptoms}, format='json',
+                                   HTTP_AUTHORIZATION=f'Token {token.key}')
+            started = time.perf_counter()
+            response = views.predict_disease(request)
+            elapsed = (time.perf_counter() - started) * 1000
+            close_old_connections()
+            return elapsed, response.status_code
+
+        for mode in options['modes']:
+            with override_settings(PREDICTION_WRITE_MODE=mode):
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                    results = list(pool.map(call, symptom_sets))
+                wall = time.perf_counter() - started
+                flush_deferred_writes()
+                drained = time.perf_counter() - started
+
+            timings = [elapsed for elapsed, _ in results]
+            failures = sum(1 for _, code in results if code >= 500)
+            self.stdout.write(
+                f'{mode:>8}: p50 {percentile(timings, 0.5):.2f} ms, p99 {percentile(timings, 0.99):.2f} ms, '
+                f'mean {statistics.mean(timings):.2f} ms, {len(results) / wall:.0f} req/s, '
+                f'writes drained after {drained:.2f}s, {failures} server errors'
+            )
+            if mode == 'deferred':
+                self.stdout.write(f'          write-behind: {get_write_behind_queue().stats()}')
@@ -0,0 +1,147 @@
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models import DoctorProfile, MedicalRecord, PatientProfile, SymptomPrediction, UserProfile
+from api.statistics import get_doctor_statistics, reconcile_statistics
+
+SEED_BATCH_SIZE = 10000
+
+
+@contextmanager
+def explicit_created_at(*model_classes):
+    """Let bulk_create keep the created_at values we generate instead of auto_now_add"""
+    fields = [model._meta.get_field('created_at') for model in model_classes]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Show query plans and latencies for the hot MedicalRecord/SymptomPrediction queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic medical records (each with a prediction) first')
+        parser.add_argument('--patients', type=int, default=10000, help='Synthetic patients to spread records over')
+        parser.add_argument('--doctors', type=int, default=50, help='Synthetic doctors analysing predictions')
+        parser.add_argument('--days', type=int, default=365, help='Spread created_at over this many past days')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query (median is reported)')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'], options['patients'], options['doctors'], options['days'])
+
+        last_record = MedicalRecord.objects.select_related('patient').order_by('-id').first()
+        patient = last_record.patient if last_record else None
+        doctor = DoctorProfile.objects.order_by('-id').first()
+        if patient is None or doctor is None:
+            self.stderr.write('Need at least one patient and one doctor; run with --seed')
+            return
+
+        seven_days_ago = timezone.now() - timedelta(days=7)
+        queries = [
+            ('patient records, newest first',
+             MedicalRecord.objects.filter(patient=patient).order_by('-created_at')[:50], None),
+            ('latest 50 records (doctor overview)',
+             MedicalRecord.objects.order_by('-created_at')[:50], None),
+            ('patient prediction history page',
+             SymptomPrediction.objects.filter(medical_record__patient=patient).order_by('-created_at', '-id')[:20], None),
+            ('predictions in the last 7 days',
+             SymptomPrediction.objects.filter(created_at__gte=seven_days_ago), 'count'),
+            ('analyses by one doctor',
+             SymptomPrediction.objects.filter(analyzed_by_doctor=doctor), 'count'),
+            ('analyses by one doctor in the last 7 days',
+             SymptomPrediction.objects.filter(analyzed_by_doctor=doctor, created_at__gte=seven_days_ago), 'count'),
+        ]
+
+        self.stdout.write(f'MedicalRecord rows: {MedicalRecord.objects.count()}, '
+                          f'SymptomPrediction rows: {SymptomPrediction.objects.count()}')
+        for label, queryset, aggregate in queries:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                if aggregate == 'count':
+                    queryset.count()
+                else:
+                    list(queryset.all())  # fresh clone so the result cache is not reused
+                timings.append((time.perf_counter() - started) * 1000)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{label}: median {statistics.median(timings):.2f} ms'))
+            self.stdout.write(queryset.explain())
+
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            get_doctor_statistics(doctor.user)
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\ndoctor dashboard counters: median {statistics.median(timings):.2f} ms'))
+
+    def seed(self, n_records, n_patients, n_doctors, n_days):
+        self.stdout.write(f'Seeding {n_records} records for {n_patients} patients...')
+        started = time.perf_counter()
+        run_id = int(time.time())
+
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                [User(username=f'bench_{run_id}_p{i}', first_name='Bench', last_name=str(i)) for i in range(n_patients)]
+                + [User(username=f'bench_{run_id}_d{i}', first_name='Doc', last_name=str(i)) for i in range(n_doctors)],
+                batch_size=SEED_BATCH_SIZE,
+            )
+            patient_users, doctor_users = users[:n_patients], users[n_patients:]
+            UserProfile.objects.bulk_create(
+                [UserProfile(user=user, user_type='patient') for user in patient_users]
+                + [UserProfile(user=user, user_type='doctor') for user in doctor_users],
+                batch_size=SEED_BATCH_SIZE,
+            )
+            patients = PatientProfile.objects.bulk_create(
+                [PatientProfile(user=user) for user in patient_users], batch_size=SEED_BATCH_SIZE
+            )
+            doctors = DoctorProfile.objects.bulk_create(
+                [DoctorProfile(user=user, license_number=f'BENCH_{user.id}') for user in doctor_users],
+                batch_size=SEED_BATCH_SIZE,
+            )
+
+        now = timezone.now()
+        with explicit_created_at(MedicalRecord, SymptomPrediction):
+            for offset in range(0, n_records, SEED_BATCH_SIZE):
+                batch_size = min(SEED_BATCH_SIZE, n_records - offset)
+                created = [now - timedelta(seconds=random.randint(0, n_days * 86400)) for _ in range(batch_size)]
+                with transaction.atomic():
+                    records = MedicalRecord.objects.bulk_create([
+                        MedicalRecord(patient=random.choice(patients), symptoms='itching, skin_rash', created_at=created_at)
+                        for created_at in created
+                    ])
+                    SymptomPrediction.objects.bulk_create([
+                        SymptomPrediction(
+                            medical_record=record,
+                            predicted_condition='Fungal infection',
+                            confidence_score=random.random(),
+                            predicted_severity='mild',
+                            recommendations='Follow medical advice',
+                            analyzed_by_doctor=random.choice(doctors) if random.random() < 0.3 else None,
+                            created_at=record.created_at,
+                        )
+                        for record in records
+                    ])
+                self.stdout.write(f'  {offset + batch_size}/{n_records}', ending='\r')
+
+        # bulk_create bypasses the signals that maintain the dashboard counters
+        reconcile_statistics()
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(f'\nSeeded in {time.perf_counter() - started:.1f}s')
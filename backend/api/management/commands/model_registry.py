@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.inference import MODEL_PATH, get_model_registry
+
+
+class Command(BaseCommand):
+    help = 'List, publish and activate model versions; serving processes switch to the active version on their next poll'
+
+    def add_arguments(self, parser):
+        subcommands = parser.add_subparsers(dest='action', required=True)
+        subcommands.add_parser('list', help='Show published versions')
+        publish = subcommands.add_parser('publish', help='Add an existing model file as a new version')
+        publish.add_argument('model_path', nargs='?', default=str(MODEL_PATH))
+        publish.add_argument('--no-activate', action='store_true')
+        activate = subcommands.add_parser('activate', help='Serve a published version (also used to roll back)')
+        activate.add_argument('version')
+
+    def handle(self, *args, **options):
+        registry = get_model_registry()
+        if registry is None:
+            raise CommandError('MODEL_REGISTRY is not configured')
+
+        if options['action'] == 'list':
+            active = registry.active_version()
+            for manifest in registry.versions():
+                marker = '*' if manifest['version'] == active else ' '
+                accuracy = manifest['metrics'].get('accuracy')
+                self.stdout.write(f"{marker} {manifest['version']}  {manifest['created_at']}  "
+                                  f"accuracy={accuracy}  {len(manifest['diseases'])} diseases, "
+                                  f"{len(manifest['symptoms'])} symptoms")
+        elif options['action'] == 'publish':
+            manifest = registry.publish(options['model_path'], activate=not options['no_activate'])
+            self.stdout.write(self.style.SUCCESS(f"Published {manifest['version']}"))
+        else:
+            try:
+                registry.activate(options['version'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"Activated {options['version']}"))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.statistics import reconcile_statistics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized dashboard statistics from the medical record and prediction tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-old-buckets', action='store_true',
+                            help='Do not delete hourly prediction buckets older than the recent window')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        totals = reconcile_statistics(prune=not options['keep_old_buckets'])
+        for name, value in totals.items():
+            self.stdout.write(f'{name}: {value}')
+        self.stdout.write(self.style.SUCCESS(f'Statistics reconciled in {time.perf_counter() - started:.2f}s'))
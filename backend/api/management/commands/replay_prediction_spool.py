@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.write_behind import get_write_behind_queue
+
+
+class Command(BaseCommand):
+    help = 'Save predictions left in the write-behind spool by processes that exited without flushing'
+
+    def handle(self, *args, **options):
+        write_queue = get_write_behind_queue()
+        write_queue.flush()
+        write_queue.stop()
+        stats = write_queue.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {stats['recovered']} predictions ({stats['written']} written, {stats['failed']} failed)"
+        ))
@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.inference import DATASET_PATH, MODEL_PATH, get_model_registry
+from api.ml_model import train_model_file
+from api.model_registry import train_model_version
+from api.models import TrainingJob
+from api.training_jobs import training_metrics, training_options
+
+
+class Command(BaseCommand):
+    help = ('Train the disease model in this process and publish it to the model registry '
+            '(or atomically replace the model file); servers pick it up without a restart')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', default=str(DATASET_PATH), help='Training CSV')
+        parser.add_argument('--output', help='Model file to write instead of publishing to the registry')
+        parser.add_argument('--no-activate', action='store_true',
+                            help='Publish the version to the registry without making it active')
+        parser.add_argument('--dedupe', action='store_true',
+                            help='Fit on unique rows weighted by their counts (default MODEL_TRAINING DEDUPLICATE)')
+        parser.add_argument('--chunk-rows', type=int,
+                            help='Stream the dataset and grow the forest this many rows at a time '
+                                 '(for exports larger than memory; default MODEL_TRAINING CHUNK_ROWS)')
+
+    def handle(self, *args, **options):
+        registry = None if options['output'] else get_model_registry()
+        model_path = options['output'] or str(MODEL_PATH)
+        train_options = training_options()
+        if options['chunk_rows']:
+            train_options['chunk_rows'] = options['chunk_rows']
+        if options['dedupe']:
+            train_options['dedupe'] = True
+
+        job = TrainingJob.objects.create(
+            dataset_path=options['dataset'], model_path=registry.root if registry else model_path,
+            status='running', started_at=timezone.now()
+        )
+        try:
+            if registry is not None:
+                result = train_model_version(options['dataset'], registry.root,
+                                             activate=not options['no_activate'], **train_options)
+            else:
+                result = train_model_file(options['dataset'], model_path, **train_options)
+        except Exception as e:
+            TrainingJob.objects.filter(pk=job.pk).update(status='failed', error=str(e), finished_at=timezone.now())
+            raise CommandError(f'Training job {job.pk} failed: {e}')
+
+        metrics = training_metrics(result)
+        TrainingJob.objects.filter(pk=job.pk).update(status='succeeded', metrics=metrics, finished_at=timezone.now())
+        self.stdout.write(json.dumps(metrics, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Training job {job.pk} succeeded'))
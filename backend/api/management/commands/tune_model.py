@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.inference import DATASET_PATH
+from api.training import pick_candidate, search_forest_params
+
+
+class Command(BaseCommand):
+    help = ('Randomized, cross-validated search over forest hyperparameters within a time budget; '
+            'reports accuracy, fit time, model size and inference latency per candidate')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', default=str(DATASET_PATH), help='Training CSV')
+        parser.add_argument('--iterations', type=int, default=20, help='Random candidates besides the baseline')
+        parser.add_argument('--cv', type=int, default=5, help='Cross-validation folds')
+        parser.add_argument('--time-budget', type=float, default=300, help='Seconds after which no new candidate starts')
+        parser.add_argument('--n-jobs', type=int, default=-1, help='Cores for folds and fits (-1 = all)')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for drawing candidates')
+        parser.add_argument('--accuracy-tolerance', type=float, default=0.001,
+                            help='CV accuracy the recommended candidate may give up for lower latency')
+        parser.add_argument('--report', help='Write the full report as JSON to this file')
+
+    def handle(self, *args, **options):
+        report = search_forest_params(
+            options['dataset'], n_iter=options['iterations'], cv=options['cv'],
+            time_budget=options['time_budget'], n_jobs=options['n_jobs'], random_state=options['seed'],
+        )
+        results = report['candidates']
+
+        self.stdout.write(f"{'cv acc':>8} {'test acc':>8} {'fit s':>7} {'size KB':>8} {'row ms':>7} "
+                          f"{'batch us':>8}  params")
+        for result in sorted(results, key=lambda r: (-r['cv_accuracy'], r['single_row_ms'])):
+            self.stdout.write(
+                f"{result['cv_accuracy']:8.4f} {result['test_accuracy']:8.4f} {result['fit_seconds']:7.2f} "
+                f"{result['model_bytes'] / 1024:8.0f} {result['single_row_ms']:7.3f} {result['batch_row_us']:8.2f}  "
+                f"{result['params']}{' (current)' if result['baseline'] else ''}"
+            )
+        self.stdout.write(f"{len(results)} candidates in {report['elapsed_seconds']}s, "
+                          f"{report['skipped']} skipped by the time budget")
+
+        choice = pick_candidate(results, options['accuracy_tolerance'])
+        report['recommended'] = choice['params']
+        self.stdout.write(self.style.SUCCESS(
+            f"Recommended: MODEL_TRAINING['FOREST_PARAMS'] = {choice['params']}"
+        ))
+
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_alter_medicalrecord_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="medicalrecord",
+            name="symptom_bits_0",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="medicalrecord",
+            name="symptom_bits_1",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="medicalrecord",
+            name="symptom_bits_2",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="medicalrecord",
+            name="symptom_layout",
+            field=models.CharField(blank=True, max_length=16),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_medicalrecord_symptom_bits"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="medicalrecord",
+            index=models.Index(fields=["patient", "-created_at"], name="api_record_patient_created"),
+        ),
+        migrations.AddIndex(
+            model_name="medicalrecord",
+            index=models.Index(fields=["created_at"], name="api_record_created"),
+        ),
+        migrations.AddIndex(
+            model_name="symptomprediction",
+            index=models.Index(fields=["created_at"], name="api_pred_created"),
+        ),
+        migrations.AddIndex(
+            model_name="symptomprediction",
+            index=models.Index(fields=["analyzed_by_doctor", "created_at"], name="api_pred_doctor_created"),
+        ),
+    ]
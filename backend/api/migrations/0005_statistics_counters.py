@@ -0,0 +1,99 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:18
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+
+def backfill_statistics(apps, schema_editor):
+    """Fill the new counters from the tables as they are at this migration
+
+    A frozen copy of api.statistics.reconcile_statistics, so later changes to
+    that code cannot break this migration.
+    """
+    User = apps.get_model("auth", "User")
+    PatientProfile = apps.get_model("api", "PatientProfile")
+    DoctorProfile = apps.get_model("api", "DoctorProfile")
+    MedicalRecord = apps.get_model("api", "MedicalRecord")
+    SymptomPrediction = apps.get_model("api", "SymptomPrediction")
+    StatisticsCounter = apps.get_model("api", "StatisticsCounter")
+    PredictionHourlyBucket = apps.get_model("api", "PredictionHourlyBucket")
+
+    def count_of(queryset, group_field):
+        return Coalesce(Subquery(queryset.values(group_field).annotate(n=Count("pk")).values("n")[:1]), Value(0))
+
+    PatientProfile.objects.update(
+        medical_records_count=count_of(MedicalRecord.objects.filter(patient=OuterRef("pk")), "patient"),
+        predictions_count=count_of(
+            SymptomPrediction.objects.filter(medical_record__patient=OuterRef("pk")), "medical_record__patient"
+        ),
+        approved_predictions_count=count_of(
+            SymptomPrediction.objects.filter(medical_record__patient=OuterRef("pk"), doctor_approved=True),
+            "medical_record__patient",
+        ),
+    )
+    DoctorProfile.objects.update(
+        analyses_count=count_of(SymptomPrediction.objects.filter(analyzed_by_doctor=OuterRef("pk")), "analyzed_by_doctor"),
+    )
+
+    StatisticsCounter.objects.create(
+        name="total_patients", value=User.objects.filter(userprofile__user_type="patient").count()
+    )
+    StatisticsCounter.objects.create(name="total_predictions", value=SymptomPrediction.objects.count())
+
+    window_start = (timezone.now() - timedelta(days=7)).replace(minute=0, second=0, microsecond=0)
+    PredictionHourlyBucket.objects.bulk_create([
+        PredictionHourlyBucket(hour=row["hour"], count=row["n"])
+        for row in SymptomPrediction.objects.filter(created_at__gte=window_start)
+        .annotate(hour=TruncHour("created_at")).values("hour").annotate(n=Count("pk")).order_by()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PredictionHourlyBucket",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("hour", models.DateTimeField(unique=True)),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StatisticsCounter",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="doctorprofile",
+            name="analyses_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="patientprofile",
+            name="approved_predictions_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="patientprofile",
+            name="medical_records_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="patientprofile",
+            name="predictions_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
@@ -6,34 +5,88 @@ from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import accuracy_score, classification_report
 import joblib
 import os
+import time
+import uuid
+
+from .dataset import (
+    DEFAULT_CHUNK_ROWS, DatasetError, deduplicate, file_sha256, load_training_data, stream_training_data,
+)
+from .forest_engine import FlatForest
+from .symptom_bitset import layout_id, masks_to_matrix, mask_to_vector
+from .symptom_search import SymptomTrie, build_substring_index
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Upper bound on memoized partial-match lookups kept per predictor
+PARTIAL_MATCH_CACHE_SIZE = 4096
+
+# Partial-match cache marker for "not looked up yet" (None is a cached "no match")
+_NOT_CACHED = object()
+
+# Inference backends accepted by DiseasePredictor.load_model
+INFERENCE_BACKENDS = ('sklearn', 'flat')
+
+# Flat-export metadata that lets the 'flat' backend serve without unpickling the sklearn forest
+FLAT_SERVING_METADATA = ('symptoms_list', 'diseases_list', 'class_labels', 'feature_importances')
+
+# Number of ranked alternatives returned with each prediction
+TOP_K_PREDICTIONS = 3
+
+# Seed for the train/test split and the forest, so retraining on the same data gives the same model
+TRAINING_RANDOM_STATE = 42
+
+# Forest hyperparameters used unless overridden (see api/training.py for the search that checks them)
+DEFAULT_FOREST_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+}
 
 class DiseasePredictor:
     def __init__(self):
         self.model = None
+        self.engine = None
         self.label_encoder = LabelEncoder()
         self.symptoms_list = []
         self.diseases_list = []
         self.feature_importances = None
+        self.class_labels = None
+        self.load_stats = None
+        self.training_metrics = None
+        self.model_fingerprint = None
+        self.model_version = None
+        self.cache = None
+        self.symptom_index = {}
+        self.symptom_layout = None
+        self.substring_index = {}
+        self.symptom_lengths = []
+        self.symptom_trie = None
+        self._partial_match_cache = {}
         
-    def load_and_preprocess_data(self, csv_path):
-        """Load and preprocess the dataset"""
+    def load_and_preprocess_data(self, csv_path, use_cache=True):
+        """Load and preprocess the dataset
+        
+        Parsing is typed and schema-checked (api/dataset.py); with use_cache
+        a binary copy keyed by the CSV's hash is reused on later runs.
+        """
         try:
-            # Read CSV file
-            df = pd.read_csv(csv_path)
-            print(f"Dataset loaded successfully with shape: {df.shape}")
-            
-            # Check if 'prognosis' column exists
-            if 'prognosis' not in df.columns:
-                print("Error: 'prognosis' column not found in dataset")
-                return None, None
+            data = load_training_data(csv_path, use_cache=use_cache)
+            print(f"Dataset loaded successfully with shape: {data.X.shape}"
+                  f"{' (from cache)' if data.from_cache else ''}")
             
             # Features = all symptom columns (0/1 values)
-            X = df.drop('prognosis', axis=1).values
-            y = self.label_encoder.fit_transform(df['prognosis'])
+            X = data.X
+            self.label_encoder.fit(data.classes)
+            y = data.y
 
             # Save metadata
-            self.symptoms_list = df.drop('prognosis', axis=1).columns.tolist()
-            self.diseases_list = sorted(df['prognosis'].unique())
+            self.symptoms_list = data.symptoms
+            self.diseases_list = data.classes
+            self._build_symptom_index()
             
             print(f"Number of symptoms: {len(self.symptoms_list)}")
             print(f"Number of diseases: {len(self.diseases_list)}")
@@ -44,12 +97,27 @@ class DiseasePredictor:
         except FileNotFoundError:
             print(f"Error: Dataset file not found at {csv_path}")
             return None, None
+        except DatasetError as e:
+            print(f"Error: {e}")
+            return None, None
         except Exception as e:
             print(f"Error loading data: {e}")
             return None, None
 
-    def train_model(self, csv_path):
-        """Train the Random Forest model"""
+    def train_model(self, csv_path, forest_params=None, n_jobs=None, chunk_rows=None, dedupe=False):
+        """Train the Random Forest model
+        
+        forest_params override DEFAULT_FOREST_PARAMS; n_jobs is the number of
+        cores used for the fit (-1 for all). With chunk_rows the dataset is
+        streamed and the forest grown chunk by chunk (train_model_chunked).
+        With dedupe the forest is fit on unique (symptoms, disease) rows
+        weighted by their counts; the test split is taken first, so it still
+        holds every test row.
+        """
+        if chunk_rows:
+            return self.train_model_chunked(csv_path, chunk_rows, forest_params=forest_params, n_jobs=n_jobs,
+                                            dedupe=dedupe)
+        
         print("Starting model training...")
         X, y = self.load_and_preprocess_data(csv_path)
         
@@ -59,125 +127,337 @@ class DiseasePredictor:
         
         # Split the data
         X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
+            X, y, test_size=0.2, random_state=TRAINING_RANDOM_STATE, stratify=y
         )
         
         # Train the model
+        params = dict(DEFAULT_FOREST_PARAMS, **(forest_params or {}))
+        self.model = RandomForestClassifier(random_state=TRAINING_RANDOM_STATE, n_jobs=n_jobs, **params)
+        
+        fit_started = time.perf_counter()
+        if dedupe:
+            X_fit, y_fit, weights = deduplicate(X_train, y_train)
+            self.model.fit(X_fit, y_fit, sample_weight=weights)
+        else:
+            X_fit = X_train
+            self.model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - fit_started
+        
+        # Evaluate the model
+        self._finish_training(y_test, self.model.predict(X_test), {
+            'train_size': len(X_train),
+            'fit_rows': len(X_fit),
+            'fit_seconds': round(fit_seconds, 3),
+            'n_jobs': n_jobs,
+            'forest_params': params,
+        })
+        return True
+    
+    def train_model_chunked(self, csv_path, chunk_rows=DEFAULT_CHUNK_ROWS, forest_params=None, n_jobs=None,
+                            dedupe=False):
+        """Train on a dataset too large for a dense matrix
+        
+        The CSV is streamed into a bit-packed matrix (1 bit per cell) and the
+        forest is grown with warm_start: each chunk of at most chunk_rows
+        shuffled training rows, unpacked on its own, fits the next share of
+        the trees (n_estimators is raised to one tree per chunk if needed).
+        One exemplar row per disease is added to every chunk so all trees
+        agree on the class set. Peak memory is the packed matrix plus one dense chunk.
+        With dedupe each chunk is collapsed to weighted unique rows.
+        """
+        print("Starting chunked model training...")
+        try:
+            data = stream_training_data(csv_path, chunk_rows)
+        except FileNotFoundError:
+            print(f"Error: Dataset file not found at {csv_path}")
+            return False
+        except DatasetError as e:
+            print(f"Error: {e}")
+            return False
+        
+        self.symptoms_list = data.symptoms
+        self.diseases_list = data.classes
+        self.label_encoder.fit(data.classes)
+        self._build_symptom_index()
+        print(f"Dataset streamed: {len(data)} rows x {len(data.symptoms)} symptoms, "
+              f"{data.packed.nbytes / 1024 / 1024:.1f} MB packed")
+        
+        # Random (not stratified) split and shuffled chunks, since exports are often sorted by disease
+        rng = np.random.default_rng(TRAINING_RANDOM_STATE)
+        order = rng.permutation(len(data))
+        test_count = int(len(order) * 0.2)
+        test_rows, train_rows = order[:test_count], order[test_count:]
+        
+        _, first_rows = np.unique(data.y[train_rows], return_index=True)
+        if len(first_rows) != len(data.classes):
+            print("Every disease needs at least one training row. Training aborted.")
+            return False
+        exemplar_X = data.rows(train_rows[first_rows])
+        exemplar_y = data.y[train_rows[first_rows]]
+        
+        params = dict(DEFAULT_FOREST_PARAMS, **(forest_params or {}))
+        n_estimators = params.pop('n_estimators')
+        n_chunks = -(-len(train_rows) // chunk_rows)
+        if n_chunks > n_estimators:
+            # Every chunk needs a tree of its own, or rows would be skipped or chunks outgrow chunk_rows
+            print(f"{n_chunks} chunks of {chunk_rows} rows need at least as many trees; "
+                  f"growing {n_chunks} instead of {n_estimators}")
+            n_estimators = n_chunks
+        rows_per_chunk = -(-len(train_rows) // n_chunks)
         self.model = RandomForestClassifier(
-            n_estimators=100, 
-            random_state=42,
-            max_depth=10,
-            min_samples_split=5,
-            min_samples_leaf=2
+            warm_start=True, random_state=TRAINING_RANDOM_STATE, n_jobs=n_jobs, **params
         )
         
-        self.model.fit(X_train, y_train)
+        fit_started = time.perf_counter()
+        fit_rows = 0
+        for index, (X_chunk, y_chunk) in enumerate(data.chunks(train_rows, rows_per_chunk)):
+            # Spread the trees evenly over the chunks
+            self.model.n_estimators = n_estimators * (index + 1) // n_chunks
+            X_fit, y_fit = np.vstack([X_chunk, exemplar_X]), np.concatenate([y_chunk, exemplar_y])
+            weights = None
+            if dedupe:
+                X_fit, y_fit, weights = deduplicate(X_fit, y_fit)
+            fit_rows += len(X_fit)
+            self.model.fit(X_fit, y_fit, sample_weight=weights)
+        fit_seconds = time.perf_counter() - fit_started
+        self.model.set_params(warm_start=False)
+        
+        y_pred = np.concatenate([self.model.predict(X_chunk) for X_chunk, _ in data.chunks(test_rows, rows_per_chunk)])
+        self._finish_training(data.y[test_rows], y_pred, {
+            'train_size': len(train_rows),
+            'fit_rows': fit_rows,
+            'fit_seconds': round(fit_seconds, 3),
+            'n_jobs': n_jobs,
+            'forest_params': dict(params, n_estimators=n_estimators),
+            'chunks': n_chunks,
+            'rows_per_chunk': rows_per_chunk,
+        })
+        return True
+    
+    def _finish_training(self, y_test, y_pred, metrics):
+        """Publish the freshly fitted self.model and record its test metrics"""
+        # Predictions are single rows; dispatching those to a worker pool only adds latency
+        self.model.set_params(n_jobs=None)
+        self.engine = None
+        self.model_fingerprint = uuid.uuid4().hex
+        self.model_version = self.model_fingerprint[:12]
+        self._invalidate_cache()
         
         # Get feature importances
         self.feature_importances = self.model.feature_importances_
+        self._build_class_labels()
+        self._build_symptom_search()
         
-        # Evaluate the model
-        y_pred = self.model.predict(X_test)
         accuracy = accuracy_score(y_test, y_pred)
+        self.training_metrics = dict(accuracy=float(accuracy), test_size=len(y_test), **metrics)
         
         print(f"Model trained successfully!")
         print(f"Training accuracy: {accuracy:.4f}")
-        print(f"Training set size: {len(X_train)}")
-        print(f"Test set size: {len(X_test)}")
+        print(f"Training set size: {metrics['train_size']}"
+              f"{' (%d rows fit)' % metrics['fit_rows'] if metrics['fit_rows'] != metrics['train_size'] else ''}")
+        print(f"Test set size: {len(y_test)}")
         
         # Print classification report
         print("\nClassification Report:")
-        print(classification_report(y_test, y_pred, target_names=self.diseases_list))
+        print(classification_report(y_test, y_pred, labels=range(len(self.diseases_list)),
+                                    target_names=self.diseases_list, zero_division=0))
+    
+    def _build_symptom_index(self):
+        """Precompute lookup tables used to match input symptoms to columns"""
+        self.symptom_index = {symptom: i for i, symptom in enumerate(self.symptoms_list)}
+        self.symptom_layout = layout_id(self.symptoms_list)
         
-        return True
+        # Every substring of every symptom name -> columns containing it, in column order
+        self.substring_index = build_substring_index(self.symptoms_list)
+        
+        self.symptom_lengths = sorted({len(symptom) for symptom in self.symptoms_list})
+        self._partial_match_cache = {}
+    
+    def _build_symptom_search(self):
+        """Prefix trie for autocomplete, ranked by feature importance"""
+        self.symptom_trie = SymptomTrie(self.symptoms_list, self.feature_importances, self.substring_index)
+    
+    def _match_symptom(self, clean_symptom):
+        """Return the column index for a cleaned symptom name, or None"""
+        idx = self.symptom_index.get(clean_symptom)
+        if idx is not None or not clean_symptom:
+            return idx
+        
+        # One lookup: another thread may clear the cache between a check and a read
+        cached = self._partial_match_cache.get(clean_symptom, _NOT_CACHED)
+        if cached is not _NOT_CACHED:
+            return cached
+        
+        # Partial match: first column whose name contains the input...
+        columns = self.substring_index.get(clean_symptom)
+        best = columns[0] if columns else None
+        
+        # ...or whose name is contained in the input
+        for length in self.symptom_lengths:
+            if length >= len(clean_symptom):
+                break
+            for start in range(len(clean_symptom) - length + 1):
+                idx = self.symptom_index.get(clean_symptom[start:start + length])
+                if idx is not None and (best is None or idx < best):
+                    best = idx
+        
+        if len(self._partial_match_cache) >= PARTIAL_MATCH_CACHE_SIZE:
+            self._partial_match_cache.clear()
+        self._partial_match_cache[clean_symptom] = best
+        return best
+    
+    def _predict_proba(self, X):
+        """Class probabilities from the selected inference backend"""
+        if self.engine is not None:
+            return self.engine.predict_proba(X)
+        return self.model.predict_proba(X)
+    
+    def _build_class_labels(self):
+        """Precompute the column -> disease name lookup for predict_proba output"""
+        self.class_labels = self.label_encoder.inverse_transform(self.model.classes_).tolist()
+    
+    def _format_prediction(self, prediction_proba):
+        """Build the prediction result from one row of class probabilities"""
+        best_idx = int(np.argmax(prediction_proba))
+        
+        # Top-k without sorting the full probability vector
+        k = min(TOP_K_PREDICTIONS, len(prediction_proba))
+        top_indices = np.argpartition(prediction_proba, -k)[-k:]
+        top_indices = top_indices[np.argsort(prediction_proba[top_indices])[::-1]]
+        
+        return {
+            "predicted_disease": self.class_labels[best_idx],
+            "confidence": float(prediction_proba[best_idx]),
+            "top_3_predictions": [
+                {"disease": self.class_labels[idx], "probability": float(prediction_proba[idx])}
+                for idx in top_indices
+            ],
+            "error": None
+        }
+    
+    def _match_symptoms(self, symptoms):
+        """Map symptom names to a bitmask of matched columns plus the matched names"""
+        mask = 0
+        matched_symptoms = []
+        
+        for symptom in symptoms:
+            # Clean symptom input (remove extra spaces, convert to lowercase)
+            clean_symptom = symptom.strip().lower().replace(' ', '_')
+            
+            idx = self._match_symptom(clean_symptom)
+            if idx is not None:
+                mask |= 1 << idx
+                matched_symptoms.append(self.symptoms_list[idx])
+        
+        return mask, matched_symptoms
+    
+    def _no_match_result(self):
+        return {
+            "error": "No matching symptoms found in the model",
+            "predicted_disease": None,
+            "confidence": 0.0,
+            "available_symptoms": self.symptoms_list[:20]  # Show first 20 symptoms as examples
+        }
+    
+    def attach_cache(self, cache):
+        """Put a prediction cache in front of the model"""
+        self.cache = cache
+        if cache is not None:
+            cache.invalidate(self.model_fingerprint)
+    
+    def _invalidate_cache(self):
+        if self.cache is not None:
+            self.cache.invalidate(self.model_fingerprint)
     
     def predict_disease(self, symptoms):
         """Predict disease based on symptoms"""
-        if self.model is None:
+        if self.model is None and self.engine is None:
             return {"error": "Model not trained", "predicted_disease": None, "confidence": 0.0}
         
         if not symptoms:
             return {"error": "No symptoms provided", "predicted_disease": None, "confidence": 0.0}
         
         try:
-            # Create input vector
-            X_input = np.zeros(len(self.symptoms_list))
-            matched_symptoms = []
-            
-            for symptom in symptoms:
-                # Clean symptom input (remove extra spaces, convert to lowercase)
-                clean_symptom = symptom.strip().lower().replace(' ', '_')
-                
-                # Try exact match first
-                if clean_symptom in self.symptoms_list:
-                    idx = self.symptoms_list.index(clean_symptom)
-                    X_input[idx] = 1
-                    matched_symptoms.append(clean_symptom)
-                else:
-                    # Try partial matching
-                    for i, symptom_in_list in enumerate(self.symptoms_list):
-                        if clean_symptom in symptom_in_list or symptom_in_list in clean_symptom:
-                            X_input[i] = 1
-                            matched_symptoms.append(symptom_in_list)
-                            break
+            mask, matched_symptoms = self._match_symptoms(symptoms)
             
             if not matched_symptoms:
-                return {
-                    "error": "No matching symptoms found in the model",
-                    "predicted_disease": None,
-                    "confidence": 0.0,
-                    "available_symptoms": self.symptoms_list[:20]  # Show first 20 symptoms as examples
-                }
+                return self._no_match_result()
             
-            # Make prediction
-            prediction = self.model.predict([X_input])
-            prediction_proba = self.model.predict_proba([X_input])
+            result = self.cache.get(mask) if self.cache is not None else None
+            if result is None:
+                # Single forest traversal; class, confidence and top-k all come from this vector
+                X_input = mask_to_vector(mask, len(self.symptoms_list))
+                result = self._format_prediction(self._predict_proba(X_input.reshape(1, -1))[0])
+                if self.cache is not None:
+                    self.cache.set(mask, result)
             
-            # Get predicted disease
-            predicted_disease = self.label_encoder.inverse_transform(prediction)[0]
+            return dict(result, matched_symptoms=matched_symptoms, symptom_mask=mask, symptom_layout=self.symptom_layout,
+                        model_version=self.model_version)
             
-            # Get confidence (probability of the predicted class)
-            confidence = np.max(prediction_proba)
-            
-            # Get top 3 predictions with probabilities
-            top_3_indices = np.argsort(prediction_proba[0])[-3:][::-1]
-            top_3_predictions = []
+        except Exception as e:
+            print(f"Prediction error: {e}")
+            return {"error": f"Prediction failed: {str(e)}", "predicted_disease": None, "confidence": 0.0}
+
+    def predict_many(self, symptom_lists):
+        """Predict diseases for many symptom lists with a single model call"""
+        if self.model is None and self.engine is None:
+            return [{"error": "Model not trained", "predicted_disease": None, "confidence": 0.0}
+                    for _ in symptom_lists]
+        
+        results = [None] * len(symptom_lists)
+        row_masks = []
+        row_positions = []
+        row_matches = []
+        
+        for position, symptoms in enumerate(symptom_lists):
+            if not symptoms:
+                results[position] = {"error": "No symptoms provided", "predicted_disease": None, "confidence": 0.0}
+                continue
             
-            for idx in top_3_indices:
-                disease = self.label_encoder.inverse_transform([idx])[0]
-                probability = prediction_proba[0][idx]
-                top_3_predictions.append({
-                    "disease": disease,
-                    "probability": float(probability)
-                })
+            mask, matched_symptoms = self._match_symptoms(symptoms)
+            if not matched_symptoms:
+                results[position] = self._no_match_result()
+                continue
             
-            return {
-                "predicted_disease": predicted_disease,
-                "confidence": float(confidence),
-                "matched_symptoms": matched_symptoms,
-                "top_3_predictions": top_3_predictions,
-                "error": None
-            }
+            cached = self.cache.get(mask) if self.cache is not None else None
+            if cached is not None:
+                results[position] = dict(cached, matched_symptoms=matched_symptoms, symptom_mask=mask,
+                                         symptom_layout=self.symptom_layout, model_version=self.model_version)
+                continue
             
+            row_masks.append(mask)
+            row_positions.append(position)
+            row_matches.append(matched_symptoms)
+        
+        if not row_masks:
+            return results
+        
+        try:
+            # One 2-D matrix, one forest traversal for every cache miss in the batch
+            prediction_proba = self._predict_proba(masks_to_matrix(row_masks, len(self.symptoms_list)))
         except Exception as e:
-            print(f"Prediction error: {e}")
-            return {"error": f"Prediction failed: {str(e)}", "predicted_disease": None, "confidence": 0.0}
+            print(f"Batch prediction error: {e}")
+            for position in row_positions:
+                results[position] = {"error": f"Prediction failed: {str(e)}", "predicted_disease": None, "confidence": 0.0}
+            return results
+        
+        for row_proba, mask, position, matched_symptoms in zip(prediction_proba, row_masks, row_positions, row_matches):
+            result = self._format_prediction(row_proba)
+            if self.cache is not None:
+                self.cache.set(mask, result)
+            results[position] = dict(result, matched_symptoms=matched_symptoms, symptom_mask=mask,
+                                     symptom_layout=self.symptom_layout, model_version=self.model_version)
+        
+        return results
 
-    def get_symptom_suggestions(self, partial_symptom):
+    def get_symptom_suggestions(self, partial_symptom, limit=10):
         """Get symptom suggestions based on partial input"""
-        if not self.symptoms_list:
+        if self.symptom_trie is None:
             return []
         
-        partial_clean = partial_symptom.strip().lower()
-        suggestions = []
-        
-        for symptom in self.symptoms_list:
-            if partial_clean in symptom.lower():
-                suggestions.append(symptom)
-        
-        return suggestions[:10]  # Return top 10 suggestions
+        return self.symptom_trie.search(partial_symptom, limit=limit)
     
-    def save_model(self, model_path='disease_model.joblib'):
+    def save_model(self, model_path='disease_model.joblib', export_flat=False):
         """Save the trained model"""
         if self.model:
             model_data = {
@@ -189,24 +469,106 @@ class DiseasePredictor:
             }
             joblib.dump(model_data, model_path)
             print(f"Model saved successfully at {model_path}")
+            if export_flat:
+                self.export_flat_forest(flat_forest_path(model_path))
             return True
         else:
             print("No trained model to save")
             return False
     
-    def load_model(self, model_path='disease_model.joblib'):
-        """Load a trained model"""
+    def export_flat_forest(self, directory):
+        """Write the forest as flat node arrays for the 'flat' backend, with what serving needs besides the trees"""
+        engine = FlatForest.from_sklearn(self.model)
+        engine.metadata = {
+            'symptoms_list': list(self.symptoms_list),
+            'diseases_list': list(self.diseases_list),
+            'class_labels': list(self.class_labels),
+            'feature_importances': None if self.feature_importances is None else self.feature_importances.tolist(),
+        }
+        engine.save(directory)
+        print(f"Flat forest exported to {directory}")
+    
+    def _load_flat_export(self, model_path, mmap_mode):
+        """The up-to-date, self-contained flat export next to the model file, or None"""
+        directory = flat_forest_path(model_path)
+        marker = os.path.join(directory, 'leaf_proba.npy')
+        if not os.path.exists(marker) or os.path.getmtime(marker) < os.path.getmtime(model_path):
+            return None
+        try:
+            engine = FlatForest.load(directory, mmap_mode=mmap_mode)
+        except OSError as e:
+            # Mid-swap, or an export in an older layout
+            print(f"Could not load flat forest at {directory} ({e}), loading the sklearn model")
+            return None
+        metadata = engine.metadata
+        if any(key not in metadata for key in FLAT_SERVING_METADATA) or engine.n_classes != len(metadata['class_labels']):
+            print(f"Flat forest at {directory} has no usable metadata, loading the sklearn model")
+            return None
+        return engine
+    
+    def load_model(self, model_path='disease_model.joblib', mmap_mode=None, backend='sklearn'):
+        """Load a trained model
+        
+        backend selects the inference engine: 'sklearn' calls the forest's own
+        predict_proba, 'flat' evaluates an exported FlatForest. When the model
+        has an up-to-date flat export, 'flat' serves from it alone and never
+        unpickles the sklearn forest.
+        
+        mmap_mode only applies to that flat export: with 'r' its node arrays are
+        memory-mapped read-only, so workers share one page-cache copy. It is not
+        used for the joblib file, since unpickling sklearn trees copies their
+        node arrays into private memory anyway.
+        """
+        if backend not in INFERENCE_BACKENDS:
+            print(f"Unknown inference backend: {backend}")
+            return False
+        
         try:
             if os.path.exists(model_path):
-                data = joblib.load(model_path)
-                self.model = data['model']
-                self.label_encoder = data['label_encoder']
-                self.symptoms_list = data['symptoms_list']
-                self.diseases_list = data['diseases_list']
-                self.feature_importances = data.get('feature_importances', None)
+                started = time.perf_counter()
+                engine = self._load_flat_export(model_path, mmap_mode) if backend == 'flat' else None
+                if engine is not None:
+                    # Everything comes from the export; the sklearn forest is never unpickled
+                    metadata = engine.metadata
+                    self.model = None
+                    self.engine = engine
+                    self.symptoms_list = metadata['symptoms_list']
+                    self.diseases_list = metadata['diseases_list']
+                    self.class_labels = metadata['class_labels']
+                    self.label_encoder = LabelEncoder().fit(self.class_labels)
+                    importances = metadata['feature_importances']
+                    self.feature_importances = None if importances is None else np.asarray(importances)
+                else:
+                    data = joblib.load(model_path)
+                    self.model = data['model']
+                    self.label_encoder = data['label_encoder']
+                    self.symptoms_list = data['symptoms_list']
+                    self.diseases_list = data['diseases_list']
+                    self.feature_importances = data.get('feature_importances', None)
+                    self._build_class_labels()
+                    # Without a usable export the flat backend compiles the forest in memory
+                    self.engine = FlatForest.from_sklearn(self.model) if backend == 'flat' else None
+                self._build_symptom_index()
+                self._build_symptom_search()
+                self.model_fingerprint = file_sha256(model_path)
+                # Registry-managed models are renamed to their registry version by the caller
+                self.model_version = self.model_fingerprint[:12]
+                self._invalidate_cache()
+                if engine is None:
+                    mmap_mode = None
+                self.load_stats = {
+                    'model_path': str(model_path),
+                    'mmap_mode': mmap_mode,
+                    'backend': backend,
+                    'sklearn_model_loaded': self.model is not None,
+                    'load_seconds': round(time.perf_counter() - started, 4),
+                    'max_rss_kb': _max_rss_kb(),
+                }
                 print(f"Model loaded successfully from {model_path}")
                 print(f"Available diseases: {len(self.diseases_list)}")
                 print(f"Available symptoms: {len(self.symptoms_list)}")
+                print(f"Load time: {self.load_stats['load_seconds']:.3f}s (mmap_mode={mmap_mode}, backend={backend}), "
+                      f"peak RSS: {self.load_stats['max_rss_kb']} KB")
                 return True
             else:
                 print(f"Model file not found at {model_path}")
@@ -215,6 +577,16 @@ class DiseasePredictor:
             print(f"Error loading model: {e}")
             return False
 
+def flat_forest_path(model_path):
+    """Directory holding the flat-array export of a model file"""
+    return os.path.splitext(str(model_path))[0] + '.flat'
+
+def _max_rss_kb():
+    """Peak resident set size of this process in KB, or None where unsupported"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
 # Updated common symptoms list (cleaned and standardized)
 COMMON_SYMPTOMS = [
     'itching', 'skin_rash', 'nodal_skin_eruptions', 'continuous_sneezing',
@@ -256,13 +628,33 @@ COMMON_SYMPTOMS = [
     'blister', 'red_sore_around_nose', 'yellow_crust_ooze'
 ]
 
-def train_model_if_needed(dataset_path, model_path):
+def train_model_file(dataset_path, model_path, export_flat=False, forest_params=None, n_jobs=None, chunk_rows=None,
+                     dedupe=False):
+    """Train on the dataset and atomically replace model_path; returns the training metrics
+    
+    Entry point for training worker processes: it touches neither Django nor
+    a serving predictor, and readers never see a half-written model file.
+    """
+    predictor = DiseasePredictor()
+    if not predictor.train_model(dataset_path, forest_params=forest_params, n_jobs=n_jobs, chunk_rows=chunk_rows,
+                                 dedupe=dedupe):
+        raise RuntimeError(f"Training on {dataset_path} failed")
+    
+    tmp_path = f'{model_path}.{os.getpid()}.tmp'
+    predictor.save_model(tmp_path)
+    os.replace(tmp_path, model_path)
+    if export_flat:
+        predictor.export_flat_forest(flat_forest_path(model_path))
+    
+    return dict(predictor.training_metrics, model_path=str(model_path), model_fingerprint=file_sha256(model_path))
+
+def train_model_if_needed(dataset_path, model_path, mmap_mode=None, backend='sklearn'):
     """Utility function to train model if it doesn't exist"""
     predictor = DiseasePredictor()
     
     if os.path.exists(model_path):
         print("Loading existing model...")
-        success = predictor.load_model(model_path)
+        success = predictor.load_model(model_path, mmap_mode=mmap_mode, backend=backend)
         if success:
             return predictor
     
@@ -270,7 +662,9 @@ def train_model_if_needed(dataset_path, model_path):
     if os.path.exists(dataset_path):
         success = predictor.train_model(dataset_path)
         if success:
-            predictor.save_model(model_path)
+            predictor.save_model(model_path, export_flat=(backend == 'flat'))
+            if backend == 'flat':
+                predictor.engine = FlatForest.from_sklearn(predictor.model)
             return predictor
     else:
         print(f"Dataset not found at {dataset_path}")
@@ -0,0 +1,167 @@
+"""Versioned model registry
+
+Layout of the registry directory:
+
+    versions/<version>/model.joblib     the trained model (plus model.flat/ when exported)
+    versions/<version>/manifest.json    hash, training date, metrics, symptom and disease lists
+    ACTIVE                              name of the version servers should use
+
+Versions are immutable once published; switching models (or rolling back) only
+rewrites ACTIVE, atomically. Serving processes poll ACTIVE and hot-swap the
+predictor when it changes (see inference.start_registry_poller).
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import joblib
+
+from .dataset import file_sha256
+from .ml_model import flat_forest_path, train_model_file
+
+ACTIVE_FILE = 'ACTIVE'
+MANIFEST_FILE = 'manifest.json'
+MODEL_FILE = 'model.joblib'
+VERSIONS_DIR = 'versions'
+
+
+class ModelRegistry:
+    def __init__(self, root):
+        self.root = str(root)
+        self.versions_dir = os.path.join(self.root, VERSIONS_DIR)
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def model_path(self, version):
+        return os.path.join(self.version_dir(version), MODEL_FILE)
+
+    def manifest(self, version):
+        """Manifest of a published version, or None if there is no such version"""
+        try:
+            with open(os.path.join(self.version_dir(version), MANIFEST_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def versions(self):
+        """Manifests of all published versions, newest first"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        manifests = [self.manifest(name) for name in os.listdir(self.versions_dir) if not name.startswith('.')]
+        return sorted((m for m in manifests if m), key=lambda m: m['created_at'], reverse=True)
+
+    def active_version(self):
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activate(self, version):
+        """Point ACTIVE at a published version; readers see either the old or the new name"""
+        if self.manifest(version) is None:
+            raise ValueError(f"Unknown model version: {version}")
+        tmp_path = os.path.join(self.root, f'.{ACTIVE_FILE}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, os.path.join(self.root, ACTIVE_FILE))
+
+    def publish(self, model_path, metrics=None, dataset_path=None, move=False, activate=True):
+        """Add a model file (and its flat export, if any) as a new version; returns its manifest"""
+        model_hash = file_sha256(model_path)
+        created = time.time()
+        version = time.strftime('%Y%m%d-%H%M%S', time.gmtime(created)) + '-' + model_hash[:8]
+        data = joblib.load(model_path, mmap_mode='r')
+        manifest = {
+            'version': version,
+            'sha256': model_hash,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(created)),
+            'dataset_path': str(dataset_path) if dataset_path else None,
+            'metrics': metrics or {},
+            'symptoms': list(data['symptoms_list']),
+            'diseases': list(data['diseases_list']),
+        }
+
+        # Build the version in a hidden directory, then rename it into place in one step
+        staging = os.path.join(self.versions_dir, f'.staging-{uuid.uuid4().hex[:8]}')
+        os.makedirs(staging)
+        try:
+            staged_model = os.path.join(staging, MODEL_FILE)
+            flat_dir = flat_forest_path(model_path)
+            if move:
+                shutil.move(str(model_path), staged_model)
+                if os.path.isdir(flat_dir):
+                    shutil.move(flat_dir, flat_forest_path(staged_model))
+            else:
+                shutil.copy2(str(model_path), staged_model)
+                if os.path.isdir(flat_dir):
+                    shutil.copytree(flat_dir, flat_forest_path(staged_model))
+            with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.rename(staging, self.version_dir(version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return manifest
+
+
+def train_model_version(dataset_path, registry_root, export_flat=False, activate=True, forest_params=None, n_jobs=None,
+                        chunk_rows=None, dedupe=False):
+    """Train a model straight into the registry; returns its manifest
+
+    Like train_model_file this runs in training worker processes without Django.
+    """
+    registry = ModelRegistry(registry_root)
+    os.makedirs(registry.versions_dir, exist_ok=True)
+    staging_path = os.path.join(registry.versions_dir, f'.train-{os.getpid()}-{uuid.uuid4().hex[:8]}.joblib')
+    try:
+        metrics = train_model_file(dataset_path, staging_path, export_flat=export_flat,
+                                   forest_params=forest_params, n_jobs=n_jobs, chunk_rows=chunk_rows, dedupe=dedupe)
+        metrics.pop('model_path', None)
+        return registry.publish(staging_path, metrics=metrics, dataset_path=dataset_path, move=True, activate=activate)
+    finally:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+        shutil.rmtree(flat_forest_path(staging_path), ignore_errors=True)
+
+
+class RegistryPoller:
+    """Background thread calling on_change(version) whenever the registry's ACTIVE version changes"""
+
+    def __init__(self, registry, interval, on_change, current_version=None):
+        self.registry = registry
+        self.interval = interval
+        self.on_change = on_change
+        self.current_version = current_version
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='model-registry-poller', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def poll(self):
+        version = self.registry.active_version()
+        if version is None or version == self.current_version:
+            return False
+        # Remember the version even if loading fails, so a broken model is not reloaded every tick
+        self.current_version = version
+        try:
+            self.on_change(version)
+        except Exception as e:
+            print(f"Model registry: switching to {version} failed: {e}")
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.poll()
@@ -1,8 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
+from . import statistics
+from .authentication import invalidate_cached_tokens
+from .symptom_bitset import BITSET_WORDS, mask_to_words, words_to_mask
 
 class UserProfile(models.Model):
     USER_TYPE_CHOICES = [
@@ -34,6 +37,10 @@ class PatientProfile(models.Model):
     blood_type = models.CharField(max_length=5, blank=True)
     height = models.FloatField(null=True, blank=True, help_text="Height in cm")
     weight = models.FloatField(null=True, blank=True, help_text="Weight in kg")
+    # Denormalized statistics, maintained by api.statistics
+    medical_records_count = models.PositiveIntegerField(default=0)
+    predictions_count = models.PositiveIntegerField(default=0)
+    approved_predictions_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name}"
@@ -78,10 +85,34 @@ class DoctorProfile(models.Model):
     hospital_affiliation = models.CharField(max_length=200, blank=True)
     phone = models.CharField(max_length=15, blank=True)
     is_verified = models.BooleanField(default=False)
+    # Denormalized statistics, maintained by api.statistics
+    analyses_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"Dr. {self.user.first_name} {self.user.last_name} - {self.get_specialization_display()}"
 
+class MedicalRecordQuerySet(models.QuerySet):
+    def with_symptoms(self, mask, layout):
+        """Records whose symptom bitset, built under column layout, contains every bit of mask
+
+        Bits stored under another layout (a model with a different symptom
+        order) mean other symptoms, so those records are never matched.
+        No index can serve a (bits & mask) = mask test, so this scans the
+        rows left by the other filters, comparing a few integer columns each.
+        """
+        queryset = self.filter(symptom_layout=layout)
+        for i, word in enumerate(mask_to_words(mask)):
+            if word:
+                field = f'symptom_bits_{i}'
+                queryset = queryset.alias(**{f'{field}_matched': models.F(field).bitand(word)}).filter(
+                    **{f'{field}_matched': word}
+                )
+        return queryset
+
+    def with_symptom(self, index, layout):
+        """Records that include the symptom at the given column of layout"""
+        return self.with_symptoms(1 << index, layout)
+
 class MedicalRecord(models.Model):
     SEVERITY_CHOICES = [
         ('mild', 'Mild'),
@@ -112,15 +143,41 @@ class MedicalRecord(models.Model):
     allergies = models.TextField(blank=True)
     doctor_notes = models.TextField(blank=True)
     is_analyzed_by_doctor = models.BooleanField(default=False)
+    # Matched symptom columns of the prediction model as a bitset split over 64-bit words
+    symptom_bits_0 = models.BigIntegerField(null=True, blank=True)
+    symptom_bits_1 = models.BigIntegerField(null=True, blank=True)
+    symptom_bits_2 = models.BigIntegerField(null=True, blank=True)
+    # symptom_bitset.layout_id of the model columns the bits refer to
+    symptom_layout = models.CharField(max_length=16, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = MedicalRecordQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A patient's records newest first, and the doctors' global "latest records" list
+            models.Index(fields=['patient', '-created_at'], name='api_record_patient_created'),
+            models.Index(fields=['created_at'], name='api_record_created'),
+        ]
 
     def __str__(self):
         return f"Record for {self.patient} on {self.created_at.date()}"
 
+    @property
+    def symptom_mask(self):
+        words = [getattr(self, f'symptom_bits_{i}') for i in range(BITSET_WORDS)]
+        if all(word is None for word in words):
+            return None
+        return words_to_mask(words)
+
+    @symptom_mask.setter
+    def symptom_mask(self, mask):
+        words = mask_to_words(mask) if mask is not None else [None] * BITSET_WORDS
+        for i, word in enumerate(words):
+            setattr(self, f'symptom_bits_{i}', word)
+
 class SymptomPrediction(models.Model):
     medical_record = models.OneToOneField(MedicalRecord, on_delete=models.CASCADE)
     predicted_condition = models.CharField(max_length=100)
@@ -133,9 +190,55 @@ class SymptomPrediction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Prediction history ordering and the 7-day statistics window
+            models.Index(fields=['created_at'], name='api_pred_created'),
+            # Per-doctor analysis counts, optionally bounded by date
+            models.Index(fields=['analyzed_by_doctor', 'created_at'], name='api_pred_doctor_created'),
+        ]
+
     def __str__(self):
         return f"Prediction for {self.medical_record.patient} - {self.predicted_condition}"
 
+class TrainingJob(models.Model):
+    """A model training run in the training worker process (api.training_jobs)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    dataset_path = models.CharField(max_length=500)
+    model_path = models.CharField(max_length=500)
+    metrics = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Training job {self.id} ({self.status})"
+
+class StatisticsCounter(models.Model):
+    """Global dashboard totals, one row per counter name"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+class PredictionHourlyBucket(models.Model):
+    """Predictions created per hour, summed over the recent-activity window"""
+    hour = models.DateTimeField(unique=True)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.hour}: {self.count}"
+
 @receiver(post_save, sender=User)
 def create_auth_token(sender, instance=None, created=False, **kwargs):
     if created:
@@ -152,4 +255,63 @@ def create_patient_profile(sender, instance=None, created=False, **kwargs):
         # Only create PatientProfile if user_type is patient (default)
         user_profile = UserProfile.objects.get(user=instance)
         if user_profile.user_type == 'patient':
-            PatientProfile.objects.create(user=instance)
\ No newline at end of file
+            PatientProfile.objects.create(user=instance)
+
+# STATISTICS COUNTERS
+@receiver(pre_save, sender=UserProfile)
+def remember_user_type(sender, instance, **kwargs):
+    instance._previous_user_type = (
+        sender.objects.filter(pk=instance.pk).values_list('user_type', flat=True).first() if instance.pk else None
+    )
+
+@receiver(post_save, sender=UserProfile)
+def count_user_type(sender, instance, **kwargs):
+    statistics.record_user_type_changed(instance._previous_user_type, instance.user_type)
+
+@receiver(post_delete, sender=UserProfile)
+def uncount_user_type(sender, instance, **kwargs):
+    statistics.record_user_type_changed(instance.user_type, None)
+
+@receiver(post_save, sender=MedicalRecord)
+def count_medical_record(sender, instance, created=False, **kwargs):
+    if created:
+        statistics.record_medical_records_created([instance])
+
+@receiver(post_delete, sender=MedicalRecord)
+def uncount_medical_record(sender, instance, **kwargs):
+    statistics.record_medical_records_created([instance], sign=-1)
+
+@receiver(pre_save, sender=SymptomPrediction)
+def remember_prediction_review(sender, instance, **kwargs):
+    instance._previous_review = (
+        sender.objects.filter(pk=instance.pk).values_list('analyzed_by_doctor_id', 'doctor_approved').first()
+        if instance.pk else None
+    )
+
+@receiver(post_save, sender=SymptomPrediction)
+def count_prediction(sender, instance, created=False, **kwargs):
+    if created:
+        statistics.record_predictions_created([instance])
+    elif instance._previous_review is not None:
+        statistics.record_prediction_changed(instance, *instance._previous_review)
+
+@receiver(post_delete, sender=SymptomPrediction)
+def uncount_prediction(sender, instance, **kwargs):
+    try:
+        patient_id = instance.medical_record.patient_id
+    except MedicalRecord.DoesNotExist:
+        patient_id = None
+    statistics.record_predictions_created([instance], patient_ids=[patient_id], sign=-1)
+
+# AUTHENTICATION CACHE
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=PatientProfile)
+@receiver(post_delete, sender=PatientProfile)
+@receiver(post_save, sender=DoctorProfile)
+@receiver(post_delete, sender=DoctorProfile)
+@receiver(post_delete, sender=Token)
+def forget_cached_tokens(sender, instance, **kwargs):
+    invalidate_cached_tokens(instance.pk if sender is User else instance.user_id)
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """In-process LRU cache of prediction results with a per-entry TTL"""
+
+    backend = 'local'
+
+    def __init__(self, max_size=4096, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.namespace = ''
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and entry[1] < time.monotonic():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + (self.ttl or 0))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace):
+        """Drop every entry; called whenever a different model is loaded or trained"""
+        with self._lock:
+            self.namespace = namespace
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'namespace': self.namespace,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class DjangoPredictionCache:
+    """Prediction cache stored in a Django cache alias, shared by every worker using it
+
+    Keys are namespaced by the model fingerprint, so loading a different model
+    makes old entries unreachable without having to delete them.
+    """
+
+    backend = 'django'
+
+    def __init__(self, alias='default', ttl=300, key_prefix='prediction'):
+        from django.core.cache import caches
+
+        self.alias = alias
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.namespace = ''
+        self.hits = 0
+        self.misses = 0
+        self._cache = caches[alias]
+        self._lock = threading.Lock()
+
+    def _make_key(self, mask):
+        return f'{self.key_prefix}:{self.namespace}:{mask:x}'
+
+    def get(self, key):
+        value = self._cache.get(self._make_key(key))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._cache.set(self._make_key(key), value, self.ttl or None)
+
+    def invalidate(self, namespace):
+        self.namespace = namespace
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'alias': self.alias,
+            'namespace': self.namespace,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def build_prediction_cache(config):
+    """Create the cache described by the PREDICTION_CACHE setting, or None when disabled"""
+    if not config or not config.get('BACKEND'):
+        return None
+
+    backend = config['BACKEND']
+    ttl = config.get('TTL', 300)
+    if backend == 'local':
+        return PredictionCache(max_size=config.get('MAX_SIZE', 4096), ttl=ttl)
+    if backend == 'django':
+        return DjangoPredictionCache(alias=config.get('ALIAS', 'default'), ttl=ttl)
+    raise ValueError(f"Unknown prediction cache backend: {backend}")
@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import MedicalRecord, SymptomPrediction
+from .statistics import record_medical_records_created, record_predictions_created
+
+WRITE_MODES = ('sync', 'deferred')
+
+
+def build_prediction_rows(patient_profile_id, doctor_profile_id, symptoms, details, result):
+    """Unsaved MedicalRecord and SymptomPrediction for one prediction result"""
+    record = MedicalRecord(
+        patient_id=patient_profile_id,
+        doctor_id=doctor_profile_id,
+        symptoms=', '.join(symptoms),
+        duration=details.get('duration', ''),
+        severity=details.get('severity', ''),
+        previous_conditions=details.get('previous_conditions', ''),
+        current_medications=details.get('current_medications', ''),
+        allergies=details.get('allergies', ''),
+        is_analyzed_by_doctor=doctor_profile_id is not None,
+        symptom_mask=result.get('symptom_mask'),
+        symptom_layout=result.get('symptom_layout') or '',
+    )
+    prediction = SymptomPrediction(
+        predicted_condition=result['predicted_disease'],
+        confidence_score=result['confidence'],
+        predicted_severity='mild',  # adjust if AI returns severity
+        recommendations='Follow medical advice',
+        analyzed_by_doctor_id=doctor_profile_id,
+        doctor_approved=False,
+    )
+    return record, prediction
+
+
+def save_prediction(record, prediction):
+    """Insert the record and its prediction (and their statistics) in one transaction"""
+    with transaction.atomic():
+        record.save()
+        prediction.medical_record = record
+        prediction.save()
+    return record, prediction
+
+
+def save_predictions(rows):
+    """Insert many (record, prediction) pairs with two bulk inserts in one transaction
+
+    A record's created_at set beforehand (the request time of a deferred
+    write) is kept for the record and its prediction instead of the insert time.
+    """
+    requested_at = [record.created_at for record, _ in rows]
+    with transaction.atomic():
+        records = MedicalRecord.objects.bulk_create([record for record, _ in rows])
+        for record, (_, prediction) in zip(records, rows):
+            prediction.medical_record = record
+        predictions = SymptomPrediction.objects.bulk_create([prediction for _, prediction in rows])
+        # bulk_create stamps created_at with the insert time, so put requested times back
+        backdated = [(record, prediction, moment)
+                     for record, prediction, moment in zip(records, predictions, requested_at) if moment]
+        if backdated:
+            for record, prediction, moment in backdated:
+                record.created_at = prediction.created_at = moment
+            MedicalRecord.objects.bulk_update([record for record, _, _ in backdated], ['created_at'])
+            SymptomPrediction.objects.bulk_update([prediction for _, prediction, _ in backdated], ['created_at'])
+        # bulk_create skips the signals that keep the statistics counters current
+        record_medical_records_created(records)
+        record_predictions_created(predictions, patient_ids=[record.patient_id for record in records])
+    return records, predictions
+
+
+def write_prediction(record, prediction):
+    """Persist a prediction according to PREDICTION_WRITE_MODE
+
+    'sync' saves before returning and lets errors propagate; 'deferred' spools
+    the rows to the write-behind queue and returns immediately, unless the
+    queue stays full, in which case the rows are saved here after all.
+    """
+    from .write_behind import WriteQueueFull, get_write_behind_queue
+
+    mode = getattr(settings, 'PREDICTION_WRITE_MODE', 'sync')
+    if mode == 'sync':
+        return save_prediction(record, prediction)
+    if mode == 'deferred':
+        try:
+            get_write_behind_queue().put(record, prediction)
+        except WriteQueueFull as e:
+            print(f"{e}; saving prediction synchronously")
+            return save_prediction(record, prediction)
+        return None
+    raise ValueError(f"Unknown prediction write mode: {mode}")
+
+
+def flush_deferred_writes():
+    """Block until every deferred write submitted so far has been saved"""
+    if getattr(settings, 'PREDICTION_WRITE_MODE', 'sync') == 'deferred':
+        from .write_behind import get_write_behind_queue
+        get_write_behind_queue().flush()
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import PatientProfile, DoctorProfile, MedicalRecord, SymptomPrediction, UserProfile
+from .models import PatientProfile, DoctorProfile, MedicalRecord, SymptomPrediction, UserProfile, TrainingJob
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -57,6 +57,9 @@ class MedicalRecordSerializer(serializers.ModelSerializer):
     patient_name = serializers.SerializerMethodField()
     doctor_name = serializers.SerializerMethodField()
     
+    # Relations read by get_patient_name/get_doctor_name
+    select_related_fields = ('patient__user', 'doctor__user')
+    
     class Meta:
         model = MedicalRecord
         fields = ['id', 'patient', 'doctor', 'symptoms', 'duration', 'severity', 
@@ -65,6 +68,11 @@ class MedicalRecordSerializer(serializers.ModelSerializer):
                  'patient_name', 'doctor_name']
         read_only_fields = ['created_at', 'updated_at', 'patient_name', 'doctor_name']
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Join the relations the serializer reads so listing does not query per object"""
+        return queryset.select_related(*cls.select_related_fields)
+
     def get_patient_name(self, obj):
         return f"{obj.patient.user.first_name} {obj.patient.user.last_name}"
 
@@ -99,6 +107,25 @@ class PredictionSerializer(serializers.Serializer):
         min_length=1
     )
 
+class BatchPredictionItemSerializer(serializers.Serializer):
+    symptoms = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        min_length=1
+    )
+    patient_id = serializers.IntegerField(required=False)
+    duration = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+    severity = serializers.CharField(max_length=10, required=False, allow_blank=True, default='')
+    previous_conditions = serializers.CharField(required=False, allow_blank=True, default='')
+    current_medications = serializers.CharField(required=False, allow_blank=True, default='')
+    allergies = serializers.CharField(required=False, allow_blank=True, default='')
+
+class BatchPredictionSerializer(serializers.Serializer):
+    predictions = serializers.ListField(
+        child=BatchPredictionItemSerializer(),
+        min_length=1,
+        max_length=500
+    )
+
 class PredictionResponseSerializer(serializers.Serializer):
     predicted_disease = serializers.CharField()
     confidence = serializers.FloatField()
@@ -122,4 +149,21 @@ class UserListSerializer(serializers.ModelSerializer):
                 return PatientProfileSerializer(obj.patientprofile).data
             elif obj.userprofile.user_type == 'doctor' and hasattr(obj, 'doctorprofile'):
                 return DoctorProfileSerializer(obj.doctorprofile).data
-        return None
\ No newline at end of file
+        return None
+
+class TrainingJobSerializer(serializers.ModelSerializer):
+    requested_by = serializers.SerializerMethodField()
+    duration_seconds = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = TrainingJob
+        fields = ['id', 'status', 'requested_by', 'metrics', 'error', 'created_at', 
+                 'started_at', 'finished_at', 'duration_seconds']
+    
+    def get_requested_by(self, obj):
+        return obj.requested_by.username if obj.requested_by else None
+    
+    def get_duration_seconds(self, obj):
+        if obj.started_at and obj.finished_at:
+            return round((obj.finished_at - obj.started_at).total_seconds(), 3)
+        return None
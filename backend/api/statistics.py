@@ -0,0 +1,178 @@
+"""Denormalized dashboard statistics
+
+Kept current by the signal receivers in models.py; code that bypasses signals
+(bulk_create) must call the record_* helpers itself. The reconcile_statistics
+management command rebuilds everything from the source tables.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+TOTAL_PATIENTS = 'total_patients'
+TOTAL_PREDICTIONS = 'total_predictions'
+
+# Length of the rolling window behind 'recent_predictions'
+RECENT_WINDOW = timedelta(days=7)
+
+
+def _model(name, apps=global_apps):
+    return apps.get_model('api', name)
+
+
+def _truncate_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def increment_counter(name, delta):
+    if not delta:
+        return
+    StatisticsCounter = _model('StatisticsCounter')
+    if not StatisticsCounter.objects.filter(name=name).update(value=F('value') + delta):
+        try:
+            with transaction.atomic():
+                StatisticsCounter.objects.create(name=name, value=delta)
+        except IntegrityError:
+            StatisticsCounter.objects.filter(name=name).update(value=F('value') + delta)
+
+
+def _add_to_bucket(hour, delta):
+    PredictionHourlyBucket = _model('PredictionHourlyBucket')
+    if not PredictionHourlyBucket.objects.filter(hour=hour).update(count=F('count') + delta) and delta > 0:
+        try:
+            with transaction.atomic():
+                PredictionHourlyBucket.objects.create(hour=hour, count=delta)
+        except IntegrityError:
+            PredictionHourlyBucket.objects.filter(hour=hour).update(count=F('count') + delta)
+
+
+def _increment_each(model_name, field, deltas):
+    """Add deltas[pk] to field for every pk, one UPDATE per distinct delta"""
+    model = _model(model_name)
+    by_delta = {}
+    for pk, delta in deltas.items():
+        if pk is not None and delta:
+            by_delta.setdefault(delta, []).append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
+
+
+def record_medical_records_created(records, sign=1):
+    """Account for new (or, with sign=-1, deleted) medical records"""
+    _increment_each('PatientProfile', 'medical_records_count',
+                    {pk: sign * n for pk, n in Counter(r.patient_id for r in records).items()})
+
+
+def record_predictions_created(predictions, patient_ids=None, sign=1):
+    """Account for new (or, with sign=-1, deleted) predictions
+
+    patient_ids may be passed in the same order as predictions to avoid
+    loading each prediction's medical record.
+    """
+    predictions = list(predictions)
+    if not predictions:
+        return
+    if patient_ids is None:
+        patient_ids = [p.medical_record.patient_id for p in predictions]
+
+    _increment_each('PatientProfile', 'predictions_count',
+                    {pk: sign * n for pk, n in Counter(patient_ids).items()})
+    _increment_each('PatientProfile', 'approved_predictions_count',
+                    {pk: sign * n for pk, n in Counter(
+                        pk for pk, p in zip(patient_ids, predictions) if p.doctor_approved).items()})
+    _increment_each('DoctorProfile', 'analyses_count',
+                    {pk: sign * n for pk, n in Counter(p.analyzed_by_doctor_id for p in predictions).items()})
+    increment_counter(TOTAL_PREDICTIONS, sign * len(predictions))
+
+    now = timezone.now()
+    for hour, n in Counter(_truncate_hour(p.created_at or now) for p in predictions).items():
+        _add_to_bucket(hour, sign * n)
+
+
+def record_prediction_changed(prediction, old_doctor_id, old_approved):
+    """Account for a doctor picking up or approving an existing prediction"""
+    if old_doctor_id != prediction.analyzed_by_doctor_id:
+        _increment_each('DoctorProfile', 'analyses_count',
+                        {old_doctor_id: -1, prediction.analyzed_by_doctor_id: 1})
+    if bool(old_approved) != bool(prediction.doctor_approved):
+        _increment_each('PatientProfile', 'approved_predictions_count',
+                        {prediction.medical_record.patient_id: 1 if prediction.doctor_approved else -1})
+
+
+def record_user_type_changed(old_type, new_type):
+    delta = (new_type == 'patient') - (old_type == 'patient')
+    increment_counter(TOTAL_PATIENTS, delta)
+
+
+def get_doctor_statistics(doctor_user):
+    """Doctor dashboard numbers in a single query, or None without a doctor profile"""
+    StatisticsCounter = _model('StatisticsCounter')
+    PredictionHourlyBucket = _model('PredictionHourlyBucket')
+    DoctorProfile = _model('DoctorProfile')
+
+    def counter(name):
+        return Coalesce(Subquery(StatisticsCounter.objects.filter(name=name).values('value')[:1]), Value(0))
+
+    window_start = _truncate_hour(timezone.now() - RECENT_WINDOW)
+    recent = PredictionHourlyBucket.objects.filter(hour__gte=window_start).annotate(
+        group=Value(1, output_field=IntegerField())
+    ).values('group').annotate(total=Sum('count')).values('total')
+
+    return DoctorProfile.objects.filter(user=doctor_user).annotate(
+        total_patients=counter(TOTAL_PATIENTS),
+        total_predictions=counter(TOTAL_PREDICTIONS),
+        recent_predictions=Coalesce(Subquery(recent[:1]), Value(0)),
+    ).values('total_patients', 'total_predictions', 'recent_predictions', 'analyses_count').first()
+
+
+def reconcile_statistics(apps=global_apps, prune=True):
+    """Recompute every counter from the source tables"""
+    User = apps.get_model('auth', 'User')
+    PatientProfile = _model('PatientProfile', apps)
+    DoctorProfile = _model('DoctorProfile', apps)
+    MedicalRecord = _model('MedicalRecord', apps)
+    SymptomPrediction = _model('SymptomPrediction', apps)
+    StatisticsCounter = _model('StatisticsCounter', apps)
+    PredictionHourlyBucket = _model('PredictionHourlyBucket', apps)
+
+    def count_of(queryset, group_field):
+        return Coalesce(
+            Subquery(queryset.values(group_field).annotate(n=Count('pk')).values('n')[:1]), Value(0)
+        )
+
+    with transaction.atomic():
+        PatientProfile.objects.update(
+            medical_records_count=count_of(MedicalRecord.objects.filter(patient=OuterRef('pk')), 'patient'),
+            predictions_count=count_of(
+                SymptomPrediction.objects.filter(medical_record__patient=OuterRef('pk')), 'medical_record__patient'),
+            approved_predictions_count=count_of(
+                SymptomPrediction.objects.filter(medical_record__patient=OuterRef('pk'), doctor_approved=True),
+                'medical_record__patient'),
+        )
+        DoctorProfile.objects.update(
+            analyses_count=count_of(
+                SymptomPrediction.objects.filter(analyzed_by_doctor=OuterRef('pk')), 'analyzed_by_doctor'),
+        )
+
+        totals = {
+            TOTAL_PATIENTS: User.objects.filter(userprofile__user_type='patient').count(),
+            TOTAL_PREDICTIONS: SymptomPrediction.objects.count(),
+        }
+        for name, value in totals.items():
+            StatisticsCounter.objects.update_or_create(name=name, defaults={'value': value})
+
+        window_start = _truncate_hour(timezone.now() - RECENT_WINDOW)
+        PredictionHourlyBucket.objects.filter(hour__gte=window_start).delete()
+        if prune:
+            PredictionHourlyBucket.objects.filter(hour__lt=window_start).delete()
+        PredictionHourlyBucket.objects.bulk_create([
+            PredictionHourlyBucket(hour=row['hour'], count=row['n'])
+            for row in SymptomPrediction.objects.filter(created_at__gte=window_start)
+            .annotate(hour=TruncHour('created_at')).values('hour').annotate(n=Count('pk')).order_by()
+        ])
+
+    return totals
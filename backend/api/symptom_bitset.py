@@ -0,0 +1,46 @@
+import hashlib
+
+import numpy as np
+
+WORD_BITS = 64
+
+# MedicalRecord stores a symptom mask in this many signed 64-bit columns (133 symptoms -> 3 words)
+BITSET_WORDS = 3
+
+
+def layout_id(symptoms):
+    """Short id of a symptom column order; a mask is only meaningful under the layout it was built with"""
+    return hashlib.sha256('\n'.join(symptoms).encode('utf-8')).hexdigest()[:16]
+
+
+def mask_to_vector(mask, n_features):
+    """Expand a bitmask into a 0/1 uint8 feature vector"""
+    packed = np.frombuffer(mask.to_bytes((n_features + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(packed, count=n_features, bitorder='little')
+
+
+def masks_to_matrix(masks, n_features):
+    """Expand many bitmasks into a 0/1 uint8 feature matrix, one row per mask"""
+    n_bytes = (n_features + 7) // 8
+    packed = np.frombuffer(b''.join(mask.to_bytes(n_bytes, 'little') for mask in masks), dtype=np.uint8)
+    return np.unpackbits(packed.reshape(len(masks), n_bytes), axis=1, count=n_features, bitorder='little')
+
+
+def _to_signed(word):
+    return word - (1 << WORD_BITS) if word >= 1 << (WORD_BITS - 1) else word
+
+
+def mask_to_words(mask, n_words=BITSET_WORDS):
+    """Split a bitmask into signed 64-bit words suitable for BigIntegerField columns"""
+    if mask >> (WORD_BITS * n_words):
+        raise ValueError(f"Symptom mask does not fit in {n_words} words")
+    return [_to_signed((mask >> (WORD_BITS * i)) & ((1 << WORD_BITS) - 1)) for i in range(n_words)]
+
+
+def words_to_mask(words):
+    """Inverse of mask_to_words; None words count as empty"""
+    mask = 0
+    for i, word in enumerate(words):
+        if word:
+            mask |= (word & ((1 << WORD_BITS) - 1)) << (WORD_BITS * i)
+    return mask
@@ -0,0 +1,83 @@
+# Longest ranked suggestion list kept on each trie node
+MAX_SUGGESTIONS = 25
+
+
+def normalize_query(text):
+    """Lowercase and join words with underscores, the way symptom columns are named"""
+    return '_'.join(text.strip().lower().split())
+
+
+def build_substring_index(names):
+    """Every substring of every name -> indices of the names containing it, in order"""
+    substring_index = {}
+    for i, name in enumerate(names):
+        for start in range(len(name)):
+            for end in range(start + 1, len(name) + 1):
+                indices = substring_index.setdefault(name[start:end], [])
+                if not indices or indices[-1] != i:
+                    indices.append(i)
+    return {key: tuple(indices) for key, indices in substring_index.items()}
+
+
+class _TrieNode:
+    __slots__ = ('children', 'ranked')
+
+    def __init__(self):
+        self.children = {}
+        self.ranked = ()
+
+
+class SymptomTrie:
+    """Prefix index over symptom names and over each word inside them
+
+    "fev" matches both "high_fever" (second word) and "fever" (first word).
+    Results are ranked by the position of the matched word, then by feature
+    importance, then alphabetically. Every node stores its ranked list, so a
+    lookup is one walk down the trie. Queries that match no word prefix fall
+    back to plain substring matches.
+    """
+
+    def __init__(self, symptoms, importances=None, substring_index=None):
+        self.symptoms = list(symptoms)
+        self.substring_index = substring_index if substring_index is not None else build_substring_index(
+            [symptom.lower() for symptom in self.symptoms]
+        )
+        importances = list(importances) if importances is not None else [0.0] * len(self.symptoms)
+
+        root = _TrieNode()
+        candidates = {}  # node -> {symptom index: best word position}
+        for i, symptom in enumerate(self.symptoms):
+            words = symptom.lower().split('_')
+            for position in range(len(words)):
+                node = root
+                for char in '_'.join(words[position:]):
+                    node = node.children.setdefault(char, _TrieNode())
+                    best = candidates.setdefault(node, {})
+                    best[i] = min(best.get(i, position), position)
+
+        for node, best in candidates.items():
+            ranked = sorted(best, key=lambda i: (best[i], -importances[i], self.symptoms[i]))
+            node.ranked = tuple(self.symptoms[i] for i in ranked[:MAX_SUGGESTIONS])
+
+        self.root = root
+
+    def search(self, query, limit=10):
+        """Ranked symptom names matching the query"""
+        query = normalize_query(query)
+        if not query:
+            return []
+
+        node = self.root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                break
+        suggestions = list(node.ranked[:limit]) if node is not None else []
+
+        if len(suggestions) < limit:
+            for i in self.substring_index.get(query, ()):
+                if self.symptoms[i] not in suggestions:
+                    suggestions.append(self.symptoms[i])
+                    if len(suggestions) == limit:
+                        break
+        return suggestions
@@ -0,0 +1,279 @@
+import contextlib
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.apps import SERVING_PROCESS_ENV, _is_serving_process
+from api.authentication import token_cache
+from api.ml_model import DiseasePredictor, flat_forest_path, train_model_file
+from api.model_registry import ModelRegistry
+from api.models import MedicalRecord, PatientProfile, SymptomPrediction
+from api.prediction_writer import build_prediction_rows, save_prediction
+from api.serializers import UserSerializer
+from api.statistics import reconcile_statistics
+from api.symptom_bitset import layout_id
+
+
+def create_user(username, user_type):
+    serializer = UserSerializer(data={
+        'username': username, 'password': 'test-password-1', 'user_type': user_type,
+        'first_name': username.title(), 'last_name': 'Test',
+    })
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {user.auth_token.key}')
+    return client
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryCountTestCase(TestCase):
+    """Base for tests that pin how many queries a view runs
+
+    The token is authenticated once before measuring, so the counts are the
+    view's own queries (authentication is served from the token cache).
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        self.doctor = create_user('doctor', 'doctor')
+        self.doctor_client = client_for(self.doctor)
+        self.doctor_client.get('/api/doctor/profile/')
+
+    def assertViewQueries(self, num, client, url):
+        with self.assertNumQueries(num):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+
+class PatientListQueryTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(60):
+            create_user(f'patient{i}', 'patient')
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        # One COUNT for the paginator, one joined SELECT for the page
+        for page_size in (5, 50):
+            with self.subTest(page_size=page_size):
+                response = self.assertViewQueries(2, self.doctor_client, f'/api/doctor/patients/?page_size={page_size}')
+                self.assertEqual(len(response.data['patients']), page_size)
+
+
+def add_predictions(patient, doctor, count):
+    """Save count records with predictions for patient, analysed by doctor"""
+    result = {'predicted_disease': 'Common Cold', 'confidence': 0.9}
+    for _ in range(count):
+        save_prediction(*build_prediction_rows(
+            patient.patientprofile.id, doctor.doctorprofile.id, ['cough', 'headache'], {}, result,
+        ))
+
+
+class MedicalRecordQueryTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = create_user('patient', 'patient')
+        self.patient_client = client_for(self.patient)
+        self.patient_client.get('/api/patient/profile/')
+
+    def assertConstantQueries(self, num, client, url, key=None):
+        # The count must not grow with the number of records listed
+        listed = 0
+        for total in (2, 12):
+            add_predictions(self.patient, self.doctor, total - listed)
+            listed = total
+            with self.subTest(records=total):
+                response = self.assertViewQueries(num, client, url)
+                rows = response.data[key] if key else response.data
+                self.assertEqual(len(rows), total)
+
+    def test_patient_records(self):
+        # Profile lookup, then the records joined with patient and doctor users
+        self.assertConstantQueries(2, self.patient_client, '/api/medical-records/')
+
+    def test_doctor_records(self):
+        self.assertConstantQueries(1, self.doctor_client, '/api/medical-records/')
+
+    def test_doctor_records_for_patient(self):
+        self.assertConstantQueries(1, self.doctor_client, f'/api/medical-records/?patient_id={self.patient.patientprofile.id}')
+
+    def test_patient_detail(self):
+        # Patient user, profile, then the recent records joined with their users
+        url = f'/api/doctor/patients/{self.patient.id}/'
+        add_predictions(self.patient, self.doctor, 2)
+        self.assertViewQueries(3, self.doctor_client, url)
+        add_predictions(self.patient, self.doctor, 8)
+        response = self.assertViewQueries(3, self.doctor_client, url)
+        self.assertEqual(len(response.data['recent_records']), 10)
+
+    def test_doctor_prediction_history(self):
+        self.assertConstantQueries(1, self.doctor_client, '/api/predictions/history/', key='history')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ModelStatusTests(TestCase):
+    def test_details_are_for_doctors_only(self):
+        public = APIClient().get('/api/model/status/')
+        self.assertEqual(set(public.data), {'ready', 'state', 'model_version'})
+
+        patient = client_for(create_user('patient', 'patient')).get('/api/model/status/')
+        self.assertEqual(set(patient.data), {'ready', 'state', 'model_version'})
+
+        doctor = client_for(create_user('doctor', 'doctor')).get('/api/model/status/')
+        self.assertIn('load_stats', doctor.data)
+        self.assertIn('cache', doctor.data)
+        self.assertEqual(doctor.status_code, public.status_code)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ApprovalCounterTests(TestCase):
+    def test_reapproving_and_rejecting_counts_once(self):
+        doctor = create_user('doctor', 'doctor')
+        patient = create_user('patient', 'patient')
+        add_predictions(patient, doctor, 1)
+        prediction = SymptomPrediction.objects.get()
+        client = client_for(doctor)
+        url = f'/api/doctor/predictions/{prediction.id}/approve/'
+
+        for approved, expected in ((True, 1), ('True', 1), (True, 1), ('False', 0), (False, 0), ('false', 0), ('true', 1)):
+            with self.subTest(approved=approved):
+                response = client.post(url, {'approved': approved}, format='json')
+                self.assertEqual(response.status_code, 200, response.data)
+                self.assertEqual(PatientProfile.objects.get(user=patient).approved_predictions_count, expected)
+
+        self.assertEqual(client.post(url, {'approved': 'maybe'}, format='json').status_code, 400)
+        reconcile_statistics()
+        self.assertEqual(PatientProfile.objects.get(user=patient).approved_predictions_count, 1)
+
+
+def write_training_csv(path):
+    """A tiny, learnable training CSV: each disease has its own symptom"""
+    rows = ['itching,cough,fever,prognosis']
+    rows += ['1,0,0,Allergy'] * 10 + ['0,1,0,Common Cold'] * 10 + ['0,0,1,Malaria'] * 10
+    with open(path, 'w') as f:
+        f.write('\n'.join(rows) + '\n')
+
+
+class TrainedModelTestCase(SimpleTestCase):
+    """Base for tests that need small model files in a temporary directory"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.csv_path = os.path.join(self.tmp.name, 'Training.csv')
+        write_training_csv(self.csv_path)
+
+    def train(self, model_path, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return train_model_file(self.csv_path, model_path, forest_params={'n_estimators': 5}, **options)
+
+
+class ModelRegistryTests(TrainedModelTestCase):
+    def test_publish_copies_flat_export(self):
+        model_path = os.path.join(self.tmp.name, 'model.joblib')
+        self.train(model_path, export_flat=True)
+        registry = ModelRegistry(os.path.join(self.tmp.name, 'registry'))
+
+        manifest = registry.publish(model_path)
+
+        version_model = registry.model_path(manifest['version'])
+        self.assertTrue(os.path.exists(version_model))
+        self.assertEqual(sorted(os.listdir(flat_forest_path(version_model))),
+                         sorted(os.listdir(flat_forest_path(model_path))))
+        # Copying leaves the source in place and no staging directory behind
+        self.assertTrue(os.path.isdir(flat_forest_path(model_path)))
+        self.assertEqual(os.listdir(registry.versions_dir), [manifest['version']])
+        self.assertEqual(registry.active_version(), manifest['version'])
+
+    def test_failed_publish_leaves_no_staging_directory(self):
+        model_path = os.path.join(self.tmp.name, 'model.joblib')
+        self.train(model_path)
+        registry = ModelRegistry(os.path.join(self.tmp.name, 'registry'))
+
+        with mock.patch('api.model_registry.json.dump', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                registry.publish(model_path)
+
+        self.assertEqual(os.listdir(registry.versions_dir), [])
+        self.assertIsNone(registry.active_version())
+
+
+class FlatBackendTests(TrainedModelTestCase):
+    def load(self, model_path, backend):
+        predictor = DiseasePredictor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(predictor.load_model(model_path, mmap_mode='r', backend=backend))
+        return predictor
+
+    def test_flat_export_is_served_without_the_sklearn_model(self):
+        model_path = os.path.join(self.tmp.name, 'model.joblib')
+        self.train(model_path, export_flat=True)
+        sklearn_predictor = self.load(model_path, 'sklearn')
+
+        with mock.patch('api.ml_model.joblib.load', side_effect=AssertionError('sklearn model unpickled')):
+            flat_predictor = self.load(model_path, 'flat')
+
+        self.assertIsNone(flat_predictor.model)
+        symptom_lists = [['itching'], ['cough', 'fever'], ['unknown']]
+        for flat, reference in zip(flat_predictor.predict_many(symptom_lists), sklearn_predictor.predict_many(symptom_lists)):
+            self.assertEqual(flat['predicted_disease'], reference['predicted_disease'])
+            self.assertAlmostEqual(flat['confidence'], reference['confidence'])
+            self.assertEqual(flat.get('matched_symptoms'), reference.get('matched_symptoms'))
+        self.assertEqual(flat_predictor.get_symptom_suggestions('it'), sklearn_predictor.get_symptom_suggestions('it'))
+
+    def test_predictions_record_their_symptom_layout(self):
+        model_path = os.path.join(self.tmp.name, 'model.joblib')
+        self.train(model_path, export_flat=True)
+        for backend in ('sklearn', 'flat'):
+            with self.subTest(backend=backend):
+                result = self.load(model_path, backend).predict_disease(['fever'])
+                self.assertEqual(result['symptom_layout'], layout_id(['itching', 'cough', 'fever']))
+                self.assertEqual(result['symptom_mask'], 0b100)
+
+    def test_flat_backend_without_export_compiles_the_model(self):
+        model_path = os.path.join(self.tmp.name, 'model.joblib')
+        self.train(model_path)
+        predictor = self.load(model_path, 'flat')
+        self.assertIsNotNone(predictor.model)
+        self.assertEqual(predictor.predict_disease(['cough'])['predicted_disease'], 'Common Cold')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SymptomFilterTests(TestCase):
+    def test_bits_only_match_under_their_own_layout(self):
+        patient = create_user('patient', 'patient')
+        old_layout, new_layout = layout_id(['cough', 'fever']), layout_id(['fever', 'cough'])
+        for symptoms, mask, layout in ((['cough'], 0b01, old_layout), (['fever'], 0b01, new_layout)):
+            result = {'predicted_disease': 'Common Cold', 'confidence': 0.9, 'symptom_mask': mask, 'symptom_layout': layout}
+            save_prediction(*build_prediction_rows(patient.patientprofile.id, None, symptoms, {}, result))
+
+        # Column 0 is 'cough' in the old layout and 'fever' in the new one
+        self.assertEqual([r.symptoms for r in MedicalRecord.objects.with_symptom(0, old_layout)], ['cough'])
+        self.assertEqual([r.symptoms for r in MedicalRecord.objects.with_symptom(0, new_layout)], ['fever'])
+
+
+class ServingProcessTests(SimpleTestCase):
+    def is_serving(self, argv, **env):
+        with mock.patch('sys.argv', argv), mock.patch.dict(os.environ, env):
+            os.environ.pop(SERVING_PROCESS_ENV, None)
+            os.environ.pop('RUN_MAIN', None)
+            os.environ.update(env)
+            return _is_serving_process()
+
+    def test_only_server_entry_points_serve(self):
+        self.assertFalse(self.is_serving(['pytest']))
+        self.assertFalse(self.is_serving(['-c']))
+        self.assertFalse(self.is_serving(['celery', 'worker']))
+        self.assertFalse(self.is_serving(['manage.py', 'migrate']))
+        self.assertFalse(self.is_serving(['manage.py', 'runserver']))
+        self.assertTrue(self.is_serving(['manage.py', 'runserver'], RUN_MAIN='true'))
+        self.assertTrue(self.is_serving(['manage.py', 'runserver', '--noreload']))
+        self.assertTrue(self.is_serving(['gunicorn', 'healthcare.wsgi'], **{SERVING_PROCESS_ENV: '1'}))
@@ -0,0 +1,132 @@
+"""Hyperparameter search for the disease forest
+
+A bounded randomized search: candidates are drawn reproducibly from
+SEARCH_SPACE (the current DEFAULT_FOREST_PARAMS always go first, as the
+baseline) and scored with stratified cross-validation, folds in parallel.
+Candidates stop being started once the wall-clock budget is spent. Every
+candidate is then refit on the full training split and measured for what
+serving cares about: test accuracy, fit time, model size and single-row and
+batch inference latency.
+"""
+import io
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import ParameterSampler, StratifiedKFold, cross_val_score, train_test_split
+
+from .ml_model import DEFAULT_FOREST_PARAMS, TRAINING_RANDOM_STATE, DiseasePredictor
+
+SEARCH_SPACE = {
+    'n_estimators': [25, 50, 100, 200, 400],
+    'max_depth': [None, 8, 10, 15, 25],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': ['sqrt', 'log2', 0.3],
+    'bootstrap': [True, False],
+}
+
+# Single-row predictions timed per candidate (the median is reported)
+LATENCY_SAMPLES = 200
+
+
+def model_size_bytes(model):
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell()
+
+
+def _inference_latency(model, X):
+    """(median single-row ms, batch µs per row) with the forest in its serving configuration"""
+    rows = X[:LATENCY_SAMPLES]
+    single = []
+    for row in rows:
+        started = time.perf_counter()
+        model.predict_proba(row.reshape(1, -1))
+        single.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    model.predict_proba(X)
+    batch = time.perf_counter() - started
+    return float(np.median(single)) * 1000, batch / len(X) * 1e6
+
+
+def evaluate_candidate(params, X_train, y_train, X_test, y_test, cv, n_jobs):
+    """Cross-validate params, refit on the training split and measure the fitted model"""
+    folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=TRAINING_RANDOM_STATE)
+    started = time.perf_counter()
+    # Folds run in parallel, so each fold's forest stays single-threaded
+    scores = cross_val_score(
+        RandomForestClassifier(random_state=TRAINING_RANDOM_STATE, **params),
+        X_train, y_train, cv=folds, n_jobs=n_jobs,
+    )
+    cv_seconds = time.perf_counter() - started
+
+    model = RandomForestClassifier(random_state=TRAINING_RANDOM_STATE, n_jobs=n_jobs, **params)
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    model.set_params(n_jobs=None)
+
+    single_row_ms, batch_row_us = _inference_latency(model, X_test)
+    return {
+        'params': params,
+        'cv_accuracy': round(float(scores.mean()), 4),
+        'cv_std': round(float(scores.std()), 4),
+        'test_accuracy': round(float((model.predict(X_test) == y_test).mean()), 4),
+        'cv_seconds': round(cv_seconds, 3),
+        'fit_seconds': round(fit_seconds, 3),
+        'model_bytes': model_size_bytes(model),
+        'single_row_ms': round(single_row_ms, 3),
+        'batch_row_us': round(batch_row_us, 2),
+    }
+
+
+def search_forest_params(dataset_path, n_iter=20, cv=5, time_budget=300, n_jobs=-1,
+                         random_state=TRAINING_RANDOM_STATE):
+    """Randomized search over SEARCH_SPACE; returns the search report
+
+    The report holds one entry per evaluated candidate (baseline first) and
+    the number of candidates skipped because time_budget seconds ran out.
+    The same arguments always evaluate the same candidates in the same order.
+    """
+    X, y = DiseasePredictor().load_and_preprocess_data(dataset_path)
+    if X is None:
+        raise RuntimeError(f"Could not load training data from {dataset_path}")
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=TRAINING_RANDOM_STATE, stratify=y
+    )
+
+    candidates = [dict(DEFAULT_FOREST_PARAMS)]
+    for params in ParameterSampler(SEARCH_SPACE, n_iter=n_iter, random_state=random_state):
+        if params not in candidates:
+            candidates.append(params)
+
+    started = time.perf_counter()
+    results = []
+    for index, params in enumerate(candidates):
+        if results and time.perf_counter() - started > time_budget:
+            break
+        result = evaluate_candidate(params, X_train, y_train, X_test, y_test, cv, n_jobs)
+        result['baseline'] = index == 0
+        results.append(result)
+        print(f"[{len(results)}/{len(candidates)}] cv={result['cv_accuracy']:.4f} "
+              f"fit={result['fit_seconds']:.2f}s row={result['single_row_ms']:.2f}ms {params}")
+
+    return {
+        'dataset_path': str(dataset_path),
+        'cv_folds': cv,
+        'n_jobs': n_jobs,
+        'time_budget': time_budget,
+        'elapsed_seconds': round(time.perf_counter() - started, 2),
+        'skipped': len(candidates) - len(results),
+        'candidates': results,
+    }
+
+
+def pick_candidate(results, accuracy_tolerance=0.0):
+    """Fastest single-row candidate whose CV accuracy is within tolerance of the best"""
+    best_accuracy = max(result['cv_accuracy'] for result in results)
+    eligible = [result for result in results if result['cv_accuracy'] >= best_accuracy - accuracy_tolerance]
+    return min(eligible, key=lambda result: (result['single_row_ms'], result['model_bytes']))
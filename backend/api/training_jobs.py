@@ -0,0 +1,120 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import inference
+from .ml_model import train_model_file
+from .model_registry import train_model_version
+from .models import TrainingJob
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# A job still active after this long was owned by a process that died
+TRAINING_JOB_TIMEOUT = timedelta(hours=1)
+
+_training_executor = None
+_training_lock = threading.Lock()
+
+
+def _get_training_executor():
+    global _training_executor
+    if _training_executor is None:
+        # spawn, not fork: forking a multi-threaded server process can deadlock the child
+        _training_executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    return _training_executor
+
+
+def active_training_job():
+    """The queued or running job, after failing jobs abandoned by dead processes"""
+    TrainingJob.objects.filter(
+        status__in=ACTIVE_STATUSES, created_at__lt=timezone.now() - TRAINING_JOB_TIMEOUT
+    ).update(status='failed', error='Abandoned: no result within the training timeout', finished_at=timezone.now())
+    return TrainingJob.objects.filter(status__in=ACTIVE_STATUSES).order_by('-created_at').first()
+
+
+def start_training_job(requested_by=None):
+    """Train a new model in the training worker process; returns (job, created)
+
+    Only one job runs at a time: while one is active it is returned instead.
+    With a model registry the model is published as a new active version,
+    otherwise it replaces MODEL_PATH. When the job succeeds the serving
+    predictor is hot-swapped to the new model.
+    """
+    with _training_lock:
+        job = active_training_job()
+        if job is not None:
+            return job, False
+
+        registry = inference.get_model_registry()
+        job = TrainingJob.objects.create(
+            requested_by=requested_by,
+            dataset_path=str(inference.DATASET_PATH),
+            model_path=registry.root if registry is not None else str(inference.MODEL_PATH),
+            status='running',
+            started_at=timezone.now(),
+        )
+        options = training_options()
+        if registry is not None:
+            future = _get_training_executor().submit(
+                train_model_version, job.dataset_path, registry.root, **options
+            )
+        else:
+            future = _get_training_executor().submit(
+                train_model_file, job.dataset_path, job.model_path, **options
+            )
+        future.add_done_callback(lambda done: _finish_training_job(job.pk, done))
+        return job, True
+
+
+def training_options():
+    """Keyword arguments for train_model_file/train_model_version from the settings"""
+    config = getattr(settings, 'MODEL_TRAINING', None) or {}
+    return {
+        'export_flat': getattr(settings, 'PREDICTOR_BACKEND', 'sklearn') == 'flat',
+        'forest_params': config.get('FOREST_PARAMS') or None,
+        'n_jobs': config.get('N_JOBS'),
+        'chunk_rows': config.get('CHUNK_ROWS'),
+        'dedupe': config.get('DEDUPLICATE', False),
+    }
+
+
+def training_metrics(result):
+    """Job metrics from train_model_file metrics or a registry manifest"""
+    if 'version' not in result:
+        return result
+    return dict(result['metrics'], model_version=result['version'], model_fingerprint=result['sha256'])
+
+
+def _finish_training_job(job_id, future):
+    """Record the result and swap the new model in; runs on the executor's callback thread"""
+    close_old_connections()
+    try:
+        _record_training_result(job_id, future)
+    finally:
+        close_old_connections()
+
+
+def _record_training_result(job_id, future):
+    try:
+        metrics = training_metrics(future.result())
+    except Exception as e:
+        print(f"Training job {job_id} failed: {e}")
+        TrainingJob.objects.filter(pk=job_id).update(status='failed', error=str(e), finished_at=timezone.now())
+        inference.training_finished(error=f'Training failed: {e}')
+        return
+
+    predictor = inference.swap_predictor()
+    if predictor is None:
+        TrainingJob.objects.filter(pk=job_id).update(
+            status='failed', metrics=metrics, error='Model trained but could not be loaded', finished_at=timezone.now()
+        )
+        inference.training_finished(error='Trained model could not be loaded')
+        return
+
+    TrainingJob.objects.filter(pk=job_id).update(status='succeeded', metrics=metrics, finished_at=timezone.now())
+    print(f"Training job {job_id} finished, now serving model {predictor.model_fingerprint[:12]}")
@@ -1,10 +1,11 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # Authentication endpoints
     path('register/', views.register, name='register'),
     path('login/', views.login, name='login'),
+    path('logout/', views.logout, name='logout'),
     
     # Patient profile endpoints
     path('patient/profile/', views.get_patient_profile, name='get_patient_profile'),
@@ -24,7 +25,11 @@ urlpatterns = [
     path('doctor/predictions/<int:prediction_id>/approve/', views.approve_prediction, name='approve_prediction'),
     
     # Disease prediction endpoints (accessible by both)
+    path('model/status/', views.get_model_status, name='get_model_status'),
+    path('model/train/', views.start_model_training, name='start_model_training'),
+    path('model/jobs/<int:job_id>/', views.get_training_job, name='get_training_job'),
     path('predict/', views.predict_disease, name='predict_disease'),
+    path('predict/batch/', views.predict_disease_batch, name='predict_disease_batch'),
     path('symptoms/', views.get_common_symptoms, name='get_common_symptoms'),
     path('symptoms/suggestions/', views.get_symptom_suggestions, name='get_symptom_suggestions'),
     path('diseases/', views.get_available_diseases, name='get_available_diseases'),
@@ -32,4 +37,11 @@ urlpatterns = [
     
     # Statistics endpoints
     path('statistics/', views.get_user_statistics, name='get_user_statistics'),
+    
+    # Async (ASGI) versions of the prediction and lookup endpoints
+    path('async/predict/', async_views.predict_disease, name='async_predict_disease'),
+    path('async/symptoms/', async_views.get_common_symptoms, name='async_get_common_symptoms'),
+    path('async/symptoms/suggestions/', async_views.get_symptom_suggestions, name='async_get_symptom_suggestions'),
+    path('async/diseases/', async_views.get_available_diseases, name='async_get_available_diseases'),
+    path('async/predictions/history/', async_views.get_prediction_history, name='async_get_prediction_history'),
 ]
\ No newline at end of file
@@ -1,34 +1,46 @@
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from .models import PatientProfile, DoctorProfile, MedicalRecord, SymptomPrediction, UserProfile
+from .models import PatientProfile, DoctorProfile, MedicalRecord, SymptomPrediction, UserProfile, TrainingJob
 from .serializers import (
     UserSerializer, PatientProfileSerializer, DoctorProfileSerializer, 
     MedicalRecordSerializer, PredictionSerializer, PredictionResponseSerializer,
-    UserListSerializer, UserProfileSerializer
+    UserListSerializer, UserProfileSerializer, BatchPredictionSerializer, TrainingJobSerializer
 )
-import os
+import base64
+import binascii
+import hashlib
+from datetime import datetime
+from django.conf import settings
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.conf import settings
-from api.ml_model import DiseasePredictor, COMMON_SYMPTOMS, train_model_if_needed
+from django.utils.cache import patch_cache_control
+from api.ml_model import COMMON_SYMPTOMS
+from .prediction_writer import build_prediction_rows, save_predictions, write_prediction
+from .inference import get_predictor, get_fallback_symptom_trie, predict_symptoms, predictor_status, DATASET_PATH
+from .statistics import get_doctor_statistics
+from .symptom_search import normalize_query
+from .training_jobs import start_training_job
 
 # Helper function to check if user is doctor
-def is_doctor(user):
+def get_user_type(user):
+    # Attached by CachedTokenAuthentication; other authentication paths load the profile
+    if hasattr(user, 'user_type'):
+        return user.user_type
     try:
-        return user.userprofile.user_type == 'doctor'
+        return user.userprofile.user_type
     except (AttributeError, UserProfile.DoesNotExist):
-        return False
+        return None
+
+def is_doctor(user):
+    return get_user_type(user) == 'doctor'
 
 def is_patient(user):
-    try:
-        return user.userprofile.user_type == 'patient'
-    except (AttributeError, UserProfile.DoesNotExist):
-        return False
+    return get_user_type(user) == 'patient'
 
 # AUTHENTICATION VIEWS
 @api_view(['POST'])
@@ -86,6 +98,14 @@ def login(request):
         }
     }, status=status.HTTP_200_OK)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout(request):
+    """Delete the caller's token; it stops working immediately in this process"""
+    if request.auth is not None:
+        request.auth.delete()
+    return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
+
 # PATIENT PROFILE VIEWS
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -158,19 +178,31 @@ def get_medical_records(request):
         # Patients can only see their own records
         try:
             profile = PatientProfile.objects.get(user=request.user)
-            records = MedicalRecord.objects.filter(patient=profile).order_by('-created_at')
+            records = MedicalRecordSerializer.setup_eager_loading(
+                MedicalRecord.objects.filter(patient=profile)
+            ).order_by('-created_at')
             serializer = MedicalRecordSerializer(records, many=True)
             return Response(serializer.data)
         except PatientProfile.DoesNotExist:
             return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
     elif is_doctor(request.user):
-        # Doctors can see all records or filter by patient
+        # Doctors can see all records or filter by patient and/or symptom
         patient_id = request.GET.get('patient_id')
+        symptom = request.GET.get('symptom', '').strip()
+        
+        records = MedicalRecordSerializer.setup_eager_loading(MedicalRecord.objects.all())
+        if symptom:
+            current_predictor = get_predictor()
+            symptom_index = current_predictor.symptom_index.get(symptom) if current_predictor else None
+            if symptom_index is None:
+                return Response({'error': f'Unknown symptom: {symptom}'}, status=status.HTTP_400_BAD_REQUEST)
+            records = records.with_symptom(symptom_index, current_predictor.symptom_layout)
+        
         if patient_id:
-            records = MedicalRecord.objects.filter(patient_id=patient_id).order_by('-created_at')
+            records = records.filter(patient_id=patient_id).order_by('-created_at')
         else:
-            records = MedicalRecord.objects.all().order_by('-created_at')[:50]  # Last 50 records
+            records = records.order_by('-created_at')[:50]  # Last 50 records
         
         serializer = MedicalRecordSerializer(records, many=True)
         return Response(serializer.data)
@@ -226,8 +258,10 @@ def get_all_patients(request):
     # Validate page_size
     page_size = min(max(page_size, 1), 100)
     
-    # Get all patients
-    patients = User.objects.filter(userprofile__user_type='patient').order_by('date_joined')
+    # Get all patients with their profile and materialized statistics in a single query
+    patients = User.objects.filter(userprofile__user_type='patient').select_related(
+        'patientprofile', 'userprofile'
+    ).order_by('date_joined')
     
     # Apply search filter
     if search:
@@ -251,17 +285,12 @@ def get_all_patients(request):
     # Serialize patient data
     patients_data = []
     for patient in patients_page.object_list:
-        # Get patient profile
         profile_data = None
-        try:
-            profile = PatientProfile.objects.get(user=patient)
-            profile_data = PatientProfileSerializer(profile).data
-        except PatientProfile.DoesNotExist:
-            pass
-        
-        # Get medical records count
-        medical_records_count = MedicalRecord.objects.filter(patient__user=patient).count()
-        predictions_count = SymptomPrediction.objects.filter(medical_record__patient__user=patient).count()
+        medical_records_count = predictions_count = 0
+        if hasattr(patient, 'patientprofile'):
+            profile_data = PatientProfileSerializer(patient.patientprofile).data
+            medical_records_count = patient.patientprofile.medical_records_count
+            predictions_count = patient.patientprofile.predictions_count
         
         patient_data = {
             'id': patient.id,
@@ -312,7 +341,9 @@ def get_patient_by_id(request, patient_id):
         profile_data = PatientProfileSerializer(profile).data
         
         # Get recent medical records
-        medical_records = MedicalRecord.objects.filter(patient=profile).order_by('-created_at')[:10]
+        medical_records = MedicalRecordSerializer.setup_eager_loading(
+            MedicalRecord.objects.filter(patient=profile)
+        ).order_by('-created_at')[:10]
         records_data = MedicalRecordSerializer(medical_records, many=True).data
         
         patient_data = {
@@ -326,8 +357,8 @@ def get_patient_by_id(request, patient_id):
             'profile': profile_data,
             'recent_records': records_data,
             'statistics': {
-                'total_records': MedicalRecord.objects.filter(patient=profile).count(),
-                'total_predictions': SymptomPrediction.objects.filter(medical_record__patient=profile).count()
+                'total_records': profile.medical_records_count,
+                'total_predictions': profile.predictions_count
             }
         }
         
@@ -337,22 +368,62 @@ def get_patient_by_id(request, patient_id):
         return Response({'error': 'Patient profile not found'}, status=status.HTTP_404_NOT_FOUND)
 
 # AI PREDICTION VIEWS (Updated for doctor access)
-BASE_DIR = getattr(settings, 'BASE_DIR', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-MODEL_PATH = os.path.join(BASE_DIR, 'disease_model.joblib')
-DATASET_PATH = os.path.join(BASE_DIR, 'Training.csv')
+PUBLIC_MODEL_STATUS_FIELDS = ('ready', 'state', 'model_version')
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_model_status(request):
+    """Report whether the prediction model is loaded and ready to serve
+    
+    Anyone (e.g. a load balancer health check) gets the readiness state;
+    load details, errors and cache counters are for doctors and staff only.
+    """
+    model_status = predictor_status()
+    response_status = status.HTTP_200_OK if model_status['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE
+    if not (request.user.is_staff or is_doctor(request.user)):
+        model_status = {key: model_status[key] for key in PUBLIC_MODEL_STATUS_FIELDS}
+    return Response(model_status, status=response_status)
 
-if not os.path.exists(DATASET_PATH):
-    DATASET_PATH = r'D:\1c\backend\Training.csv'
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def start_model_training(request):
+    """Retrain the model in the training worker process; the new model is swapped in when done"""
+    if not is_doctor(request.user):
+        return Response({'error': 'Access denied. Doctors only.'}, 
+                       status=status.HTTP_403_FORBIDDEN)
+    
+    job, created = start_training_job(requested_by=request.user)
+    if not created:
+        return Response({
+            'error': 'A training job is already in progress',
+            'job': TrainingJobSerializer(job).data
+        }, status=status.HTTP_409_CONFLICT)
+    
+    return Response(TrainingJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
-predictor = None
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_training_job(request, job_id):
+    if not is_doctor(request.user):
+        return Response({'error': 'Access denied. Doctors only.'}, 
+                       status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        job = TrainingJob.objects.select_related('requested_by').get(id=job_id)
+    except TrainingJob.DoesNotExist:
+        return Response({'error': 'Training job not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(TrainingJobSerializer(job).data, status=status.HTTP_200_OK)
 
-def get_predictor():
-    global predictor
-    if predictor is None:
-        predictor = train_model_if_needed(DATASET_PATH, MODEL_PATH)
-        if predictor is None:
-            print("Failed to initialize predictor")
-    return predictor
+def prediction_response_data(result, symptoms):
+    return {
+        'predicted_disease': result['predicted_disease'],
+        'confidence': result['confidence'],
+        'matched_symptoms': result.get('matched_symptoms', []),
+        'top_predictions': result.get('top_3_predictions', []),
+        'input_symptoms': symptoms,
+        'model_version': result.get('model_version')
+    }
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -375,7 +446,7 @@ def predict_disease(request):
     
     try:
         # Get prediction result from AI
-        result = current_predictor.predict_disease(symptoms)
+        result = predict_symptoms(current_predictor, symptoms)
         if result.get('error'):
             return Response({
                 'error': result['error'],
@@ -383,64 +454,48 @@ def predict_disease(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Prepare response data
-        response_data = {
-            'predicted_disease': result['predicted_disease'],
-            'confidence': result['confidence'],
-            'matched_symptoms': result.get('matched_symptoms', []),
-            'top_predictions': result.get('top_3_predictions', []),
-            'input_symptoms': symptoms
-        }
+        response_data = prediction_response_data(result, symptoms)
         
-        # Save prediction to database
-        try:
-            if is_patient(request.user):
-                # Patient creating their own record
-                patient_profile = PatientProfile.objects.get(user=request.user)
-                doctor_profile = None
-            elif is_doctor(request.user):
-                # Doctor analyzing for a specific patient
-                patient_id = request.data.get('patient_id')
-                if not patient_id:
-                    return Response({'error': 'patient_id is required for doctor analysis'}, 
-                                   status=status.HTTP_400_BAD_REQUEST)
-                
-                try:
-                    patient_user = User.objects.get(id=patient_id, userprofile__user_type='patient')
-                    patient_profile = PatientProfile.objects.get(user=patient_user)
-                    doctor_profile = DoctorProfile.objects.get(user=request.user)
-                except (User.DoesNotExist, PatientProfile.DoesNotExist, DoctorProfile.DoesNotExist):
-                    return Response({'error': 'Patient or doctor profile not found'}, 
-                                   status=status.HTTP_404_NOT_FOUND)
-            else:
-                return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
-            
-            # Create a MedicalRecord for this prediction
-            record = MedicalRecord.objects.create(
-                patient=patient_profile,
-                doctor=doctor_profile,
-                symptoms=', '.join(symptoms),
-                duration=request.data.get('duration', ''),
-                severity=request.data.get('severity', ''),
-                previous_conditions=request.data.get('previous_conditions', ''),
-                current_medications=request.data.get('current_medications', ''),
-                allergies=request.data.get('allergies', ''),
-                is_analyzed_by_doctor=is_doctor(request.user)
-            )
-            
-            # Create the SymptomPrediction linked to the MedicalRecord
-            SymptomPrediction.objects.create(
-                medical_record=record,
-                predicted_condition=result['predicted_disease'],
-                confidence_score=result['confidence'],
-                predicted_severity='mild',  # adjust if AI returns severity
-                recommendations='Follow medical advice',
-                analyzed_by_doctor=doctor_profile if is_doctor(request.user) else None,
-                doctor_approved=False
-            )
+        # Resolve profiles; the caller's own profile was loaded with the token
+        user_type = get_user_type(request.user)
+        if user_type == 'patient':
+            # Patient creating their own record
+            try:
+                patient_profile_id = request.user.patientprofile.id
+            except PatientProfile.DoesNotExist:
+                return Response({'error': 'Patient profile not found'}, 
+                               status=status.HTTP_404_NOT_FOUND)
+            doctor_profile_id = None
+        elif user_type == 'doctor':
+            # Doctor analyzing for a specific patient
+            patient_id = request.data.get('patient_id')
+            if not patient_id:
+                return Response({'error': 'patient_id is required for doctor analysis'}, 
+                               status=status.HTTP_400_BAD_REQUEST)
             
+            try:
+                doctor_profile_id = request.user.doctorprofile.id
+                patient_profile_id = PatientProfile.objects.values_list('id', flat=True).get(
+                    user_id=patient_id, user__userprofile__user_type='patient'
+                )
+            except (ValueError, PatientProfile.DoesNotExist, DoctorProfile.DoesNotExist):
+                return Response({'error': 'Patient or doctor profile not found'}, 
+                               status=status.HTTP_404_NOT_FOUND)
+        else:
+            return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+        
+        # Save the MedicalRecord and its SymptomPrediction in one transaction (or queue them)
+        record, prediction = build_prediction_rows(
+            patient_profile_id, doctor_profile_id, symptoms, request.data, result
+        )
+        try:
+            write_prediction(record, prediction)
         except Exception as save_error:
             print(f"Failed to save prediction: {save_error}")
-            # Do not fail the API if saving fails
+            return Response({
+                'error': 'Prediction could not be saved',
+                'details': str(save_error)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
         return Response(response_data, status=status.HTTP_200_OK)
     
@@ -451,6 +506,96 @@ def predict_disease(request):
             'details': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def predict_disease_batch(request):
+    """Predict diseases for many symptom sets with a single model call"""
+    
+    serializer = BatchPredictionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    items = serializer.validated_data['predictions']
+    
+    # The caller's own profile was loaded with the token; patients are resolved with one query
+    user_type = get_user_type(request.user)
+    if user_type == 'doctor':
+        patient_ids = {item.get('patient_id') for item in items}
+        if None in patient_ids:
+            return Response({'error': 'patient_id is required for each item in doctor analysis'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            doctor_profile_id = request.user.doctorprofile.id
+        except DoctorProfile.DoesNotExist:
+            return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        patient_profile_ids = dict(
+            PatientProfile.objects.filter(
+                user_id__in=patient_ids, user__userprofile__user_type='patient'
+            ).values_list('user_id', 'id')
+        )
+        missing_ids = sorted(patient_ids - set(patient_profile_ids))
+        if missing_ids:
+            return Response({
+                'error': 'Patient profile not found',
+                'details': missing_ids
+            }, status=status.HTTP_404_NOT_FOUND)
+    elif user_type == 'patient':
+        try:
+            patient_profile_id = request.user.patientprofile.id
+        except PatientProfile.DoesNotExist:
+            return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        doctor_profile_id = None
+    else:
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    doctor_request = user_type == 'doctor'
+    
+    current_predictor = get_predictor()
+    if current_predictor is None:
+        return Response({
+            'error': 'Disease prediction model is not available. Please check if the training dataset exists.',
+            'details': f'Looking for dataset at: {DATASET_PATH}'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    results = current_predictor.predict_many([item['symptoms'] for item in items])
+    
+    response_items = []
+    rows = []
+    for item, result in zip(items, results):
+        if result.get('error'):
+            response_items.append({
+                'error': result['error'],
+                'input_symptoms': item['symptoms']
+            })
+            continue
+        
+        response_item = prediction_response_data(result, item['symptoms'])
+        if doctor_request:
+            response_item['patient_id'] = item['patient_id']
+        response_items.append(response_item)
+        
+        rows.append(build_prediction_rows(
+            patient_profile_ids[item['patient_id']] if doctor_request else patient_profile_id,
+            doctor_profile_id, item['symptoms'], item, result
+        ))
+    
+    # Save all records and predictions with two bulk inserts
+    try:
+        save_predictions(rows)
+    except Exception as save_error:
+        print(f"Failed to save batch predictions: {save_error}")
+        return Response({
+            'error': 'Predictions could not be saved',
+            'details': str(save_error)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    return Response({
+        'results': response_items,
+        'count': len(response_items),
+        'successful': len(rows)
+    }, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def approve_prediction(request, prediction_id):
@@ -459,11 +604,16 @@ def approve_prediction(request, prediction_id):
         return Response({'error': 'Access denied. Doctors only.'}, 
                        status=status.HTTP_403_FORBIDDEN)
     
+    try:
+        approved = serializers.BooleanField().to_internal_value(request.data.get('approved', True))
+    except serializers.ValidationError:
+        return Response({'error': 'approved must be a boolean'}, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
         prediction = SymptomPrediction.objects.get(id=prediction_id)
         doctor_profile = DoctorProfile.objects.get(user=request.user)
         
-        prediction.doctor_approved = request.data.get('approved', True)
+        prediction.doctor_approved = approved
         prediction.doctor_comments = request.data.get('comments', '')
         prediction.analyzed_by_doctor = doctor_profile
         
@@ -516,19 +666,29 @@ def get_symptom_suggestions(request):
     
     current_predictor = get_predictor()
     
-    if current_predictor:
+    # Suggestions only change with the model, so clients may cache them per prefix
+    model_fingerprint = current_predictor.model_fingerprint if current_predictor else 'fallback'
+    etag = '"%s"' % hashlib.md5(f'{model_fingerprint}:{normalize_query(query)}'.encode()).hexdigest()
+    
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    elif current_predictor:
         suggestions = current_predictor.get_symptom_suggestions(query)
-        return Response({
+        response = Response({
             'suggestions': suggestions,
             'query': query
         }, status=status.HTTP_200_OK)
     else:
-        suggestions = [s for s in COMMON_SYMPTOMS if query.lower() in s.lower()][:10]
-        return Response({
+        suggestions = get_fallback_symptom_trie().search(query)
+        response = Response({
             'suggestions': suggestions,
             'query': query,
             'message': 'Using fallback symptoms'
         }, status=status.HTTP_200_OK)
+    
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'SYMPTOM_SUGGESTIONS_MAX_AGE', 300))
+    return response
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -548,111 +708,152 @@ def get_available_diseases(request):
             'count': 0
         }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
+# Prediction history page sizes: per-patient default, doctor overview default, and the most a client may request
+HISTORY_PAGE_SIZE = 20
+DOCTOR_HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 100
+
+HISTORY_FIELDS = [
+    'id', 'medical_record__symptoms', 'predicted_condition', 'confidence_score',
+    'doctor_approved', 'doctor_comments', 'created_at'
+]
+DOCTOR_HISTORY_FIELDS = HISTORY_FIELDS + [
+    'medical_record__patient__user_id',
+    'medical_record__patient__user__first_name',
+    'medical_record__patient__user__last_name'
+]
+
+def encode_history_cursor(created_at, prediction_id):
+    return base64.urlsafe_b64encode(f'{created_at.isoformat()}|{prediction_id}'.encode()).decode()
+
+def decode_history_cursor(cursor):
+    """Return (created_at, id) for a cursor; raises ValueError when malformed"""
+    try:
+        created_at, prediction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(prediction_id)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(str(e))
+
+def history_page_queryset(predictions, cursor, limit):
+    """Keyset pagination on (created_at, id), newest first; fetches one extra row to detect a next page"""
+    if cursor:
+        created_at, prediction_id = decode_history_cursor(cursor)
+        predictions = predictions.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=prediction_id)
+        )
+    return predictions.order_by('-created_at', '-id')[:limit + 1]
+
+def split_history_page(rows, limit):
+    """(rows of this page, cursor of the next page or None)"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_history_cursor(rows[-1]['created_at'], rows[-1]['id'])
+    return rows, next_cursor
+
+def paginate_history(predictions, cursor, limit):
+    return split_history_page(list(history_page_queryset(predictions, cursor, limit)), limit)
+
+def history_entry(row):
+    return {
+        'id': row['id'],
+        'symptoms': row['medical_record__symptoms'].split(', ') if row['medical_record__symptoms'] else [],
+        'predicted_disease': row['predicted_condition'],
+        'confidence': row['confidence_score'],
+        'doctor_approved': row['doctor_approved'],
+        'doctor_comments': row['doctor_comments'],
+        'created_at': row['created_at']
+    }
+
+def history_entries(rows, role):
+    history = []
+    for row in rows:
+        entry = history_entry(row)
+        if role == 'doctor':
+            entry['patient_name'] = f"{row['medical_record__patient__user__first_name']} {row['medical_record__patient__user__last_name']}"
+            entry['patient_id'] = row['medical_record__patient__user_id']
+        history.append(entry)
+    return history
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_prediction_history(request):
-    """Get prediction history based on user type"""
+    """Get prediction history based on user type, paged with ?cursor= and ?limit="""
     if is_patient(request.user):
+        role = 'patient'
+    elif is_doctor(request.user):
+        role = 'doctor'
+    else:
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    patient_id = request.GET.get('patient_id')
+    default_limit = DOCTOR_HISTORY_PAGE_SIZE if role == 'doctor' and not patient_id else HISTORY_PAGE_SIZE
+    try:
+        limit = int(request.GET.get('limit', default_limit))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(max(limit, 1), HISTORY_MAX_PAGE_SIZE)
+    cursor = request.GET.get('cursor')
+    
+    if role == 'patient':
         # Patients see only their own history
         try:
             patient_profile = PatientProfile.objects.get(user=request.user)
-            predictions = SymptomPrediction.objects.filter(
-                medical_record__patient=patient_profile
-            ).order_by('-created_at')[:20]
-            
-            history = []
-            for prediction in predictions:
-                history.append({
-                    'id': prediction.id,
-                    'symptoms': prediction.medical_record.symptoms.split(', ') if prediction.medical_record.symptoms else [],
-                    'predicted_disease': prediction.predicted_condition,
-                    'confidence': prediction.confidence_score,
-                    'doctor_approved': prediction.doctor_approved,
-                    'doctor_comments': prediction.doctor_comments,
-                    'created_at': prediction.created_at
-                })
-            
-            return Response({
-                'history': history,
-                'count': len(history)
-            }, status=status.HTTP_200_OK)
-            
         except PatientProfile.DoesNotExist:
             return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
-    
-    elif is_doctor(request.user):
+        
+        predictions = SymptomPrediction.objects.filter(
+            medical_record__patient=patient_profile
+        ).values(*HISTORY_FIELDS)
+    else:
         # Doctors see all predictions or filter by patient
-        patient_id = request.GET.get('patient_id')
+        predictions = SymptomPrediction.objects.all()
         if patient_id:
-            predictions = SymptomPrediction.objects.filter(
-                medical_record__patient__user_id=patient_id
-            ).order_by('-created_at')[:20]
-        else:
-            predictions = SymptomPrediction.objects.all().order_by('-created_at')[:50]
-        
-        history = []
-        for prediction in predictions:
-            history.append({
-                'id': prediction.id,
-                'patient_name': f"{prediction.medical_record.patient.user.first_name} {prediction.medical_record.patient.user.last_name}",
-                'patient_id': prediction.medical_record.patient.user.id,
-                'symptoms': prediction.medical_record.symptoms.split(', ') if prediction.medical_record.symptoms else [],
-                'predicted_disease': prediction.predicted_condition,
-                'confidence': prediction.confidence_score,
-                'doctor_approved': prediction.doctor_approved,
-                'doctor_comments': prediction.doctor_comments,
-                'created_at': prediction.created_at
-            })
-        
-        return Response({
-            'history': history,
-            'count': len(history)
-        }, status=status.HTTP_200_OK)
+            predictions = predictions.filter(medical_record__patient__user_id=patient_id)
+        predictions = predictions.values(*DOCTOR_HISTORY_FIELDS)
     
-    else:
-        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        rows, next_cursor = paginate_history(predictions, cursor, limit)
+    except ValueError:
+        return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    history = history_entries(rows, role)
+    
+    return Response({
+        'history': history,
+        'count': len(history),
+        'next_cursor': next_cursor
+    }, status=status.HTTP_200_OK)
 
 # STATISTICS VIEWS
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_statistics(request):
     """Get statistics based on user type"""
-    from django.utils import timezone
-    from datetime import timedelta
-    
     if is_doctor(request.user):
-        # Doctor statistics
-        total_patients = User.objects.filter(userprofile__user_type='patient').count()
-        total_predictions = SymptomPrediction.objects.count()
-        
-        # Recent activity (last 7 days)
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        recent_predictions = SymptomPrediction.objects.filter(created_at__gte=seven_days_ago).count()
-        
-        # Doctor's own analysis count
-        doctor_profile = DoctorProfile.objects.get(user=request.user)
-        doctor_analyses = SymptomPrediction.objects.filter(analyzed_by_doctor=doctor_profile).count()
+        # Doctor statistics, read from the materialized counters in one query
+        counters = get_doctor_statistics(request.user)
+        if counters is None:
+            return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
         
         statistics = {
-            'total_patients': total_patients,
-            'total_predictions': total_predictions,
-            'recent_predictions': recent_predictions,
-            'doctor_analyses': doctor_analyses,
+            'total_patients': counters['total_patients'],
+            'total_predictions': counters['total_predictions'],
+            'recent_predictions': counters['recent_predictions'],
+            'doctor_analyses': counters['analyses_count'],
         }
         
     elif is_patient(request.user):
         # Patient statistics
         try:
-            patient_profile = PatientProfile.objects.get(user=request.user)
-            patient_records = MedicalRecord.objects.filter(patient=patient_profile).count()
-            patient_predictions = SymptomPrediction.objects.filter(medical_record__patient=patient_profile).count()
-            approved_predictions = SymptomPrediction.objects.filter(
-                medical_record__patient=patient_profile,
-                doctor_approved=True
-            ).count()
+            patient_profile = PatientProfile.objects.only(
+                'medical_records_count', 'predictions_count', 'approved_predictions_count'
+            ).get(user=request.user)
+            patient_predictions = patient_profile.predictions_count
+            approved_predictions = patient_profile.approved_predictions_count
             
             statistics = {
-                'total_records': patient_records,
+                'total_records': patient_profile.medical_records_count,
                 'total_predictions': patient_predictions,
                 'approved_predictions': approved_predictions,
                 'approval_rate': round((approved_predictions / patient_predictions * 100), 2) if patient_predictions > 0 else 0
@@ -0,0 +1,340 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: spool files cannot be locked, so other processes' spools are left alone
+    fcntl = None
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import MedicalRecord, SymptomPrediction
+from .prediction_writer import save_predictions
+
+SPOOL_PREFIX = 'prediction-spool-'
+
+# Filled in by the database or by the writer rather than stored in the spool
+# (the request time is spooled separately, as the record's created_at)
+SKIPPED_FIELDS = ('id', 'created_at', 'updated_at', 'medical_record_id')
+
+# Attempts at a batch that keeps failing with OperationalError (e.g. "database is locked")
+MAX_WRITE_ATTEMPTS = 3
+
+_STOP = object()
+
+
+class WriteQueueFull(Exception):
+    """The write-behind queue stayed full for longer than its put timeout"""
+
+
+def row_values(instance):
+    """Concrete field values of an unsaved row, as stored in the spool"""
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if field.attname not in SKIPPED_FIELDS
+    }
+
+
+def _spooled_record(record_values):
+    """Unsaved MedicalRecord from spooled values, keeping the time it was requested"""
+    created_at = record_values.get('created_at')
+    return MedicalRecord(**dict(record_values, created_at=parse_datetime(created_at) if created_at else None))
+
+
+def _lock_file(fd):
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def read_spool(path):
+    """Entries of a spool file that were never acknowledged, in order"""
+    entries = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn final line from a crash mid-write
+            if 'ack' in entry:
+                for entry_id in entry['ack']:
+                    entries.pop(entry_id, None)
+            else:
+                entries[entry['id']] = entry
+    return list(entries.values())
+
+
+class PredictionSpool:
+    """Append-only JSON-lines log of queued predictions and their acknowledgements
+
+    Each process writes its own file and holds an exclusive lock on it, so a
+    file that can be locked belongs to a process that died with writes pending.
+    Without file locks (Windows) a live spool cannot be told from a dead one,
+    so spools of other processes are never claimed there.
+    """
+
+    def __init__(self, directory, fsync=False):
+        self.directory = directory
+        self.fsync = fsync
+        self.path = os.path.join(directory, f'{SPOOL_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl')
+        self.pending = 0
+        self._next_id = 0
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def recover_orphans(self):
+        """Claim spools left behind by dead processes: (unacknowledged entries, paths to delete)"""
+        os.makedirs(self.directory, exist_ok=True)
+        entries, claimed = [], []
+        if fcntl is None:
+            others = [name for name in os.listdir(self.directory)
+                      if name.startswith(SPOOL_PREFIX) and os.path.join(self.directory, name) != self.path]
+            if others:
+                print(f"Not replaying {len(others)} prediction spool(s) in {self.directory}: "
+                      "file locking is unavailable, so their owners may still be running")
+            return entries, claimed
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not name.startswith(SPOOL_PREFIX) or path == self.path:
+                continue
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue  # claimed and removed by another process
+            if not _lock_file(fd):
+                os.close(fd)
+                continue
+            entries.extend(read_spool(path))
+            claimed.append((path, fd))
+        return entries, claimed
+
+    def open(self):
+        """Create and lock this process's spool
+
+        The file is locked under a hidden name and only then renamed into
+        place, so recover_orphans never sees it unlocked.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if fcntl is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o600)
+            return
+        tmp_path = os.path.join(self.directory, f'.{os.path.basename(self.path)}.tmp')
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o600)
+        if not _lock_file(fd):
+            os.close(fd)
+            os.remove(tmp_path)
+            raise OSError(f"Could not lock prediction spool {tmp_path}")
+        os.rename(tmp_path, self.path)
+        self._fd = fd
+
+    def _write(self, entry):
+        os.write(self._fd, (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8'))
+        if self.fsync:
+            os.fsync(self._fd)
+
+    def append(self, record_values, prediction_values):
+        with self._lock:
+            self._next_id += 1
+            self._write({'id': self._next_id, 'record': record_values, 'prediction': prediction_values})
+            self.pending += 1
+            return self._next_id
+
+    def ack(self, entry_ids):
+        with self._lock:
+            self.pending -= len(entry_ids)
+            if self.pending == 0:
+                # Everything written so far is in the database: start the file over
+                os.ftruncate(self._fd, 0)
+            else:
+                self._write({'ack': list(entry_ids)})
+
+    def close(self, remove=False):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+                if remove:
+                    os.remove(self.path)
+
+
+class WriteBehindQueue:
+    """Bounded queue of predictions saved in batches by a dedicated writer thread
+
+    Rows are appended to the spool before they are queued and acknowledged
+    after their batch commits, so a crash loses nothing: the next process to
+    start replays the dead process's spool. A crash between commit and
+    acknowledgement replays that batch again (at-least-once delivery).
+    """
+
+    def __init__(self, spool_dir, batch_size=200, flush_interval_ms=50, max_queue=10000,
+                 put_timeout=2.0, fsync=False):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.put_timeout = put_timeout
+        self.spool = PredictionSpool(spool_dir, fsync=fsync)
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.recovered = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+
+    def start(self):
+        self.spool.open()
+        orphans, claimed = self.spool.recover_orphans()
+        self._thread = threading.Thread(target=self._run, name='prediction-writer', daemon=True)
+        self._thread.start()
+
+        for entry in orphans:
+            self._enqueue(entry['record'], entry['prediction'], timeout=None)
+        for path, fd in claimed:
+            os.remove(path)
+            os.close(fd)
+        self.recovered = len(orphans)
+        if orphans:
+            print(f"Recovered {len(orphans)} spooled predictions from {len(claimed)} spool file(s)")
+
+    def _enqueue(self, record_values, prediction_values, timeout):
+        entry_id = self.spool.append(record_values, prediction_values)
+        try:
+            self._queue.put((entry_id, record_values, prediction_values), timeout=timeout)
+        except queue.Full:
+            self.spool.ack([entry_id])
+            raise WriteQueueFull(f"Prediction write queue full for {timeout}s")
+
+    def put(self, record, prediction):
+        """Queue an unsaved MedicalRecord and its SymptomPrediction
+
+        Blocks while the queue is full and raises WriteQueueFull after
+        put_timeout seconds, leaving the caller to save the rows itself.
+        """
+        record_values = dict(row_values(record), created_at=timezone.now().isoformat())
+        self._enqueue(record_values, row_values(prediction), timeout=self.put_timeout)
+
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        self._queue.join()
+
+    def stop(self):
+        """Write everything still queued and stop the writer thread"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self.spool.close(remove=self.spool.pending == 0)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'spooled': self.spool.pending,
+            'written': self.written,
+            'failed': self.failed,
+            'batches': self.batches,
+            'recovered': self.recovered,
+        }
+
+    def _next_batch(self):
+        """Up to batch_size items, waiting at most flush_interval after the first; None once stopped"""
+        first = self._queue.get()
+        if first is _STOP:
+            self._queue.task_done()
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Put it back so the loop ends after this batch
+                self._queue.task_done()
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        close_old_connections()
+
+    def _insert(self, batch):
+        save_predictions([
+            (_spooled_record(record_values), SymptomPrediction(**prediction_values))
+            for _, record_values, prediction_values in batch
+        ])
+
+    def _write_batch(self, batch):
+        close_old_connections()
+        for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+            try:
+                self._insert(batch)
+                self.written += len(batch)
+                break
+            except OperationalError as e:
+                print(f"Prediction batch write failed (attempt {attempt}/{MAX_WRITE_ATTEMPTS}): {e}")
+                time.sleep(0.1 * 2 ** attempt)
+            except Exception as e:
+                # One bad row (e.g. a deleted patient) fails the batch: retry rows one by one
+                print(f"Prediction batch write failed, retrying rows individually: {e}")
+                for item in batch:
+                    try:
+                        self._insert([item])
+                        self.written += 1
+                    except Exception as row_error:
+                        self.failed += 1
+                        print(f"Dropping spooled prediction {item[0]}: {row_error}")
+                break
+        else:
+            # Leave the rows unacknowledged so they are replayed on the next start
+            self.failed += len(batch)
+            print(f"Giving up on {len(batch)} predictions; they stay in {self.spool.path}")
+            return
+
+        self.batches += 1
+        self.spool.ack([entry_id for entry_id, _, _ in batch])
+
+
+_write_behind_queue = None
+_write_behind_lock = threading.Lock()
+
+
+def get_write_behind_queue():
+    """The process-wide queue described by PREDICTION_WRITE_BEHIND, started on first use"""
+    global _write_behind_queue
+    if _write_behind_queue is None:
+        with _write_behind_lock:
+            if _write_behind_queue is None:
+                config = getattr(settings, 'PREDICTION_WRITE_BEHIND', {})
+                write_queue = WriteBehindQueue(
+                    spool_dir=config.get('SPOOL_DIR', os.path.join(settings.BASE_DIR, 'prediction_spool')),
+                    batch_size=config.get('BATCH_SIZE', 200),
+                    flush_interval_ms=config.get('FLUSH_INTERVAL_MS', 50),
+                    max_queue=config.get('MAX_QUEUE', 10000),
+                    put_timeout=config.get('PUT_TIMEOUT', 2.0),
+                    fsync=config.get('FSYNC', False),
+                )
+                write_queue.start()
+                atexit.register(write_queue.stop)
+                _write_behind_queue = write_queue
+    return _write_behind_queue
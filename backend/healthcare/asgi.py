@@ -0,0 +1,9 @@
+# healthcare/asgi.py
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare.settings')
+# Lets api.apps warm the predictor and start background threads in this process only
+os.environ.setdefault('HEALTHCARE_SERVING_PROCESS', '1')
+
+application = get_asgi_application()
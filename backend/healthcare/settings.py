@@ -52,6 +52,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'healthcare.wsgi.application'
+ASGI_APPLICATION = 'healthcare.asgi.application'
 
 DATABASES = {
     'default': {
@@ -86,13 +87,76 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
 
+# Seconds a worker may reuse a token lookup (0 disables the cache)
+AUTH_TOKEN_CACHE_TTL = 30
+
+# How /api/predict/ stores its MedicalRecord + SymptomPrediction:
+# 'sync' (in the request, one transaction) or 'deferred' (write-behind queue below)
+PREDICTION_WRITE_MODE = 'sync'
+PREDICTION_WRITE_BEHIND = {
+    'BATCH_SIZE': 200,  # rows per bulk_create
+    'FLUSH_INTERVAL_MS': 50,  # longest wait for a batch to fill
+    'MAX_QUEUE': 10000,  # queued rows before requests block
+    'PUT_TIMEOUT': 2.0,  # seconds a request blocks on a full queue before saving synchronously
+    'SPOOL_DIR': BASE_DIR / 'prediction_spool',  # crash-recovery log, one file per process
+    'FSYNC': False,  # fsync every spooled row (survive OS crashes, not just process crashes)
+}
+
+# Disease prediction model loading
+PREDICTOR_WARM_UP = True  # load the model in AppConfig.ready() instead of on the first request
+PREDICTOR_FAIL_FAST = False  # refuse to start if the model file cannot be loaded
+PREDICTOR_TRAIN_ON_DEMAND = True  # start a background training job when no model file exists
+PREDICTOR_BACKEND = 'sklearn'  # 'flat' evaluates the forest from exported node arrays (api/forest_engine.py)
+# Memory-map the flat export so workers share one page-cache copy (None to disable). Only the 'flat'
+# backend uses it: unpickled sklearn trees always get private copies of their node arrays
+PREDICTOR_MMAP_MODE = 'r'
+
+# Versioned models (api/model_registry.py). Servers load the ACTIVE version, falling back to
+# disease_model.joblib while the registry is empty, and poll ACTIVE every POLL_INTERVAL seconds
+# to hot-swap to a newly activated version (0 disables polling; DIR None disables the registry).
+MODEL_REGISTRY = {
+    'DIR': BASE_DIR / 'model_registry',
+    'POLL_INTERVAL': 5.0,
+}
+
+# Training jobs and manage.py train_model. N_JOBS: cores for the forest fit (-1 = all).
+# FOREST_PARAMS override ml_model.DEFAULT_FOREST_PARAMS; pick them with manage.py tune_model.
+# CHUNK_ROWS: stream the CSV and grow the forest chunk by chunk (None = load it all in memory).
+# DEDUPLICATE: fit on unique (symptoms, disease) rows with their counts as sample_weight.
+MODEL_TRAINING = {
+    'N_JOBS': -1,
+    'FOREST_PARAMS': {},
+    'CHUNK_ROWS': None,
+    'DEDUPLICATE': False,
+}
+
+INFERENCE_MAX_WORKERS = 4  # threads the async views run model code on
+INFERENCE_BATCHING = {
+    'ENABLED': False,  # score concurrent /api/predict/ requests together (api/batching.py)
+    'MAX_BATCH': 64,  # most requests in one predict_proba call
+    'MAX_WAIT_MS': 2.0,  # longest a request waits for others to join its batch
+    'WORKERS': 1,  # batching threads
+}
+
+# Cache of prediction results keyed by the set of matched symptom columns.
+# BACKEND: 'local' (per process LRU), 'django' (shared via CACHES[ALIAS]) or None to disable.
+PREDICTION_CACHE = {
+    'BACKEND': 'local',
+    'MAX_SIZE': 4096,
+    'TTL': 300,
+    'ALIAS': 'default',
+}
+
+# Browser cache lifetime (seconds) for /api/symptoms/suggestions/ responses
+SYMPTOM_SUGGESTIONS_MAX_AGE = 300
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
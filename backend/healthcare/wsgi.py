@@ -3,5 +3,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare.settings')
+# Lets api.apps warm the predictor and start background threads in this process only
+os.environ.setdefault('HEALTHCARE_SERVING_PROCESS', '1')
 
 application = get_wsgi_application()